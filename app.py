@@ -1,37 +1,51 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file
+from flask import Flask, Response, g, render_template, request, redirect, url_for, session, send_file, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
-from openai import OpenAI
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from lazy_imports import lazy_import
+from font_registry import available_fonts
+from thumbnail_store import make_key as make_thumbnail_key, store_from_env
+from thumbnail_output import MASTER_WIDTH, OUTPUT_WIDTHS, PREVIEW_WIDTH, encode_from_master, encode_outputs, output_key
+from thumbnail_compose import THUMBNAIL_STYLES, apply_style, compose_thumbnail, gradient_background, render_outputs
+from background_pool import pool_from_env
+from background_prep import prepare_background, unsplash_sized_url
+from keyword_index import KeywordIndex
+import http_client
+from openai_governor import governor_from_env
+from render_jobs import OwnerQueueFull, QueueFull, jobs_from_env
+from batch_jobs import BatchBusy, BatchError, BatchLedger, BatchRunner, batch_id_for, parse_batch_upload
+from seo_stream import StreamingObjectParser, format_sse
+from llm_cache import LLMCache, make_key as make_llm_key, cache_from_env as llm_cache_from_env
+from llm_schema import apply_design_defaults, apply_seo_defaults, validate_combined
+from token_budget import budget_from_env, truncate_tokens
+from session_store import session_interface_from_env
+from shared_state import SHARED_STATE_DIR, configured_workers, limiter_storage_uri, shared_path
+import metrics
+from metrics import record_cache, record_openai, record_stage, timed
 import json
 import os
-import traceback
-import base64
 import io
 import random
-import requests
 import time
 import sys
 import re
 import logging
+import uuid
 from logging.handlers import RotatingFileHandler
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
 
-load_dotenv()
-
-
-if not os.path.exists('logs'):
-    os.mkdir('logs')
+# Pillow ilk render'da yüklenir
+Image = lazy_import('PIL.Image')
 
-file_handler = RotatingFileHandler('logs/app.log', maxBytes=10240000, backupCount=10, encoding='utf-8')
-file_handler.setFormatter(logging.Formatter(
-    '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-))
-file_handler.setLevel(logging.INFO)
+load_dotenv()
 
 
 API_KEY = os.getenv("OPENAI_API_KEY")
+THUMBNAIL_SIZE = (1280, 720)
 MODEL_NAME = "gpt-4o-mini"
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
 
@@ -47,6 +61,9 @@ if not app.secret_key:
 csrf = CSRFProtect(app)
 
 debug_mode = os.getenv("FLASK_DEBUG", "False").lower() == "true"
+SEO_STREAMING = os.getenv("SEO_STREAMING", "False").lower() == "true"
+# "combined": açıklama, SEO ve tasarım /detay'da tek çağrıda üretilir; sonraki adımlar önbellekten okur
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "staged").lower()
 app.config.update(
     SESSION_COOKIE_SECURE=not debug_mode,
     SESSION_COOKIE_HTTPONLY=True,
@@ -55,31 +72,86 @@ app.config.update(
     MAX_CONTENT_LENGTH=5 * 1024 * 1024
 )
 
+# Depolama limiter.init_app ile init_app() içinde bağlanır
 limiter = Limiter(
-    app=app,
     key_func=get_remote_address,
     default_limits=["2000 per day", "500 per hour"],
-    storage_uri="memory://"
+    storage_uri=limiter_storage_uri()
 )
 
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.INFO)
-app.logger.info('YouTube Otomasyonu başlatıldı')
+THUMBNAIL_MAX_AGE = int(os.getenv("THUMBNAIL_MAX_AGE", 31536000))
+# Modele gönderilen serbest metinlerin yaklaşık token sınırları
+MAX_USER_INPUT_TOKENS = int(os.getenv("MAX_USER_INPUT_TOKENS", 400))
+MAX_DESCRIPTION_INPUT_TOKENS = int(os.getenv("MAX_DESCRIPTION_INPUT_TOKENS", 1000))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
+# Aşağıdakiler init_app() ile kurulur
+thumbnail_store = None
+llm_cache = None
+openai_governor = None
+token_budget = None
+render_jobs = None
+background_pool = None
+seo_results = None
+batch_runner = None
 
 client = None
-try:
-    if not API_KEY:
-        raise ValueError("OPENAI_API_KEY tanımlı değil")
-    
-    client = OpenAI(api_key=API_KEY, base_url="https://api.openai.com/v1/")
-    test_response = client.models.list()
-    app.logger.info("[✓] OpenAI API geçerli")
-    print("[BİLGİ]: OpenAI istemcisi başarıyla başlatıldı.")
-except Exception as e:
-    app.logger.error(f"[✗] OpenAI hatası: {e}")
-    print(f"[FATAL]: OpenAI API geçersiz! {e}")
-    sys.exit(1)
+client_lock = threading.Lock()
+openai_status = {"state": "pending", "error": None, "checked_at": None}
+OPENAI_RECHECK_SECONDS = int(os.getenv("OPENAI_RECHECK_SECONDS", 60))
+
+
+def get_client():
+    global client
+    if client is None and API_KEY:
+        with client_lock:
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(
+                    api_key=API_KEY,
+                    base_url=http_client.OPENAI_BASE_URL,
+                    http_client=http_client.openai_http_client(),
+                    max_retries=0
+                )
+    return client
+
+
+def validate_openai():
+    try:
+        if not API_KEY:
+            raise ValueError("OPENAI_API_KEY tanımlı değil")
+        get_client().models.list()
+        openai_status.update(state="ok", error=None)
+        app.logger.info("[✓] OpenAI API geçerli")
+    except Exception as e:
+        openai_status.update(state="failed", error=str(e)[:200])
+        app.logger.error(f"[✗] OpenAI hatası: {e}")
+    openai_status["checked_at"] = time.time()
+    return openai_status["state"] == "ok"
+
+
+def schedule_openai_recheck():
+    # Başarısız doğrulama sınırlı aralıklarla arka planda tekrarlanır; checked_at önceden işaretlenir ki
+    # eşzamanlı yoklamalar ikinci bir çağrı başlatmasın
+    with client_lock:
+        checked_at = openai_status["checked_at"]
+        if openai_status["state"] != "failed" or not checked_at:
+            return
+        if time.time() - checked_at <= OPENAI_RECHECK_SECONDS:
+            return
+        openai_status["checked_at"] = time.time()
+    threading.Thread(target=validate_openai, name="openai-recheck", daemon=True).start()
+
+
+def warm_up():
+    # Açılışı bekletmemek için arka planda: fontları çöz ve anahtarı doğrula
+    fonts = available_fonts()
+    if fonts:
+        app.logger.info(f"Fontlar: {', '.join(os.path.basename(f) for f in fonts)}")
+    else:
+        app.logger.warning("TrueType font bulunamadı, varsayılan font kullanılacak")
+    if os.getenv("OPENAI_VALIDATE_ON_STARTUP", "True").lower() == "true":
+        validate_openai()
 
 
 def sanitize_input(text, max_length=1000):
@@ -116,137 +188,61 @@ def ratelimit_handler(e):
     return render_template('index.html', error_message="Çok fazla istek"), 429
 
 
-def get_unsplash_image(category, title="", detailed_description=""):
+def fetch_background_image(image_url, deadline=None):
+    img_response = http_client.get(image_url, timeout=http_client.timeout_until(deadline))
+    img = Image.open(io.BytesIO(img_response.content))
+    img.info['source_url'] = image_url
+    return img
+
+
+def load_background_ref(background_ref):
+    if background_ref.get('path'):
+        img = Image.open(background_ref['path'])
+        img.info['source_path'] = background_ref['path']
+        return img
+    return fetch_background_image(background_ref['url'])
+
+
+background_index = KeywordIndex.from_file(os.getenv("BACKGROUND_QUERIES_PATH") or None)
+
+
+def build_background_query(category, title="", detailed_description=""):
+    match = background_index.match(title + " " + detailed_description, category)
+    if match:
+        group, key, query = match
+        app.logger.info(f"{group}: {key}")
+        return query + ",vibrant,high contrast"
+    return background_index.category_query(category) + ",high contrast"
+
+
+def get_unsplash_image(category, title="", detailed_description="", deadline=None):
+    query = build_background_query(category, title, detailed_description)
+    
+    if background_pool:
+        with timed("background.pool"):
+            img = background_pool.take(query)
+        if img:
+            app.logger.info(f"Arka plan havuzdan: {query}")
+            return img
+    
     if not UNSPLASH_ACCESS_KEY:
         app.logger.info("Unsplash key yok, gradient kullanılacak")
         return None
     
-    category_terms = {
-        "Vlog": "lifestyle,people,daily life,vibrant",
-        "Yemek": "food,cooking,delicious meal,colorful",
-        "Podcast": "microphone,podcast studio,recording,professional",
-        "Travel": "travel,adventure,beautiful landscape,scenic",
-        "Spor": "fitness,gym,sports training,dynamic",
-        "Oyun": "gaming,esports,neon lights,colorful",
-        "Eğitim": "education,learning,study,bright",
-        "Teknoloji": "technology,computer,modern tech,colorful",
-        "Diğer": "creative,abstract,vibrant,colorful"
-    }
-    
-    combined_text = (title + " " + detailed_description).lower()
-    specific_keywords = []
-    
-    locations = {
-        "panama": "panama city,panama landscape,central america",
-        "istanbul": "istanbul,turkey,bosphorus",
-        "paris": "paris,eiffel tower,france",
-        "tokyo": "tokyo,japan,cityscape",
-        "new york": "new york,manhattan,usa",
-        "londra": "london,big ben,england",
-        "dubai": "dubai,burj khalifa,uae",
-        "bali": "bali,indonesia,tropical",
-        "roma": "rome,colosseum,italy",
-        "barselona": "barcelona,sagrada familia,spain",
-        "amsterdam": "amsterdam,netherlands,canals",
-        "prag": "prague,czech republic,castle"
-    }
-    
-    for location, keywords in locations.items():
-        if location in combined_text:
-            specific_keywords.append(keywords)
-            app.logger.info(f"Lokasyon: {location}")
-            break
-    
-    if not specific_keywords and category == "Eğitim":
-        education_topics = {
-            "matematik": "mathematics,colorful equations,numbers,geometry",
-            "integral": "calculus,mathematics,colorful formulas",
-            "fizik": "physics,science,colorful laboratory",
-            "kimya": "chemistry,colorful laboratory,molecules",
-            "biyoloji": "biology,nature,colorful microscope",
-            "tarih": "history,ancient,colorful books",
-            "coğrafya": "geography,colorful maps,globe",
-            "edebiyat": "literature,colorful books,reading",
-            "yks": "study,exam preparation,colorful books",
-            "geometri": "geometry,colorful shapes,mathematics"
-        }
-        for topic, keywords in education_topics.items():
-            if topic in combined_text:
-                specific_keywords.append(keywords)
-                app.logger.info(f"Eğitim: {topic}")
-                break
-    
-    if not specific_keywords and category == "Spor":
-        sport_topics = {
-            "futbol": "football,soccer,colorful stadium,action",
-            "basketbol": "basketball,colorful court,action",
-            "voleybol": "volleyball,colorful net,action",
-            "fitness": "gym,workout,colorful dumbbells,dynamic",
-            "koşu": "running,marathon,colorful track,action",
-            "yüzme": "swimming,colorful pool,water,action",
-            "yoga": "yoga,meditation,colorful mat,peaceful",
-            "bacak": "leg workout,gym,colorful fitness,muscles",
-            "kol": "arm workout,colorful dumbbells,biceps,gym"
-        }
-        for topic, keywords in sport_topics.items():
-            if topic in combined_text:
-                specific_keywords.append(keywords)
-                app.logger.info(f"Spor: {topic}")
-                break
-    
-    if not specific_keywords and category == "Yemek":
-        food_topics = {
-            "pasta": "pasta,colorful italian food,delicious",
-            "pizza": "pizza,colorful cheese,restaurant",
-            "tatlı": "dessert,colorful sweet,cake",
-            "pilav": "rice,colorful turkish food,plate",
-            "çorba": "soup,hot meal,colorful bowl",
-            "salata": "salad,healthy,colorful vegetables",
-            "et": "meat,steak,colorful grill",
-            "balık": "fish,seafood,colorful ocean",
-            "hamburger": "burger,colorful fast food,delicious",
-            "makarna": "pasta,colorful noodles,italian"
-        }
-        for topic, keywords in food_topics.items():
-            if topic in combined_text:
-                specific_keywords.append(keywords)
-                app.logger.info(f"Yemek: {topic}")
-                break
-    
-    if not specific_keywords and category == "Oyun":
-        game_topics = {
-            "lol": "league of legends,gaming,colorful esports",
-            "valorant": "valorant,fps,colorful gaming",
-            "minecraft": "minecraft,blocks,colorful gaming",
-            "fortnite": "fortnite,battle royale,colorful gaming",
-            "cs": "counter strike,fps,colorful gaming",
-            "fifa": "fifa,football game,colorful soccer",
-            "gta": "gta,open world,colorful gaming"
-        }
-        for topic, keywords in game_topics.items():
-            if topic in combined_text:
-                specific_keywords.append(keywords)
-                app.logger.info(f"Oyun: {topic}")
-                break
-    
-    if specific_keywords:
-        query = specific_keywords[0] + ",vibrant,high contrast"
-    else:
-        query = category_terms.get(category, "creative,vibrant,colorful") + ",high contrast"
-    
     try:
-        url = "https://api.unsplash.com/photos/random"
+        url = f"{http_client.UNSPLASH_API_URL}/photos/random"
         params = {
             "query": query,
             "orientation": "landscape",
             "client_id": UNSPLASH_ACCESS_KEY
         }
-        response = requests.get(url, params=params, timeout=10)
+        with timed("background.search"):
+            response = http_client.get(url, params=params, timeout=http_client.timeout_until(deadline))
         if response.status_code == 200:
             data = response.json()
-            image_url = data['urls']['regular']
-            img_response = requests.get(image_url, timeout=10)
-            img = Image.open(io.BytesIO(img_response.content))
+            image_url = unsplash_sized_url(data['urls'], THUMBNAIL_SIZE)
+            with timed("background.download"):
+                img = fetch_background_image(image_url, deadline)
             app.logger.info(f"Unsplash başarılı: {query}")
             return img
         else:
@@ -257,33 +253,86 @@ def get_unsplash_image(category, title="", detailed_description=""):
         return None
 
 
-def generate_detailed_description(category, user_input):
+def cached_llm_result(cache_key, use_cache=True):
+    if llm_cache is None or not use_cache:
+        return None
+    value = llm_cache.get(cache_key)
+    record_cache("llm", value is not None)
+    return value
+
+
+def store_llm_result(cache_key, value):
+    if llm_cache is not None:
+        llm_cache.set(cache_key, value)
+
+
+def record_llm_usage(function, category, response, started, finish_reason=None):
+    record_openai(function, response)
+    if finish_reason is None and getattr(response, 'choices', None):
+        finish_reason = getattr(response.choices[0], 'finish_reason', None)
+    token_budget.record(
+        function, category, getattr(response, 'usage', None), time.perf_counter() - started, finish_reason
+    )
+    return finish_reason
+
+
+def budgeted_completion(function, category, client, deadline=None, **request):
+    # (yanıt, kesik_mi) döner; türetilmiş sınıra takılan yanıt tavanla bir kez tekrarlanır
+    limit = token_budget.max_tokens(function)
+    started = time.perf_counter()
+    response = openai_governor.chat_completion(client, deadline=deadline, max_tokens=limit, **request)
+    finish_reason = record_llm_usage(function, category, response, started)
+    ceiling = token_budget.ceilings.get(function)
+    if finish_reason == 'length' and ceiling and (limit is None or limit < ceiling):
+        app.logger.warning(f"{function} yanıtı {limit} token sınırında kesildi, {ceiling} ile tekrarlanıyor")
+        started = time.perf_counter()
+        response = openai_governor.chat_completion(client, deadline=deadline, max_tokens=ceiling, **request)
+        finish_reason = record_llm_usage(function, category, response, started)
+    if finish_reason == 'length':
+        app.logger.warning(f"{function} yanıtı kesik; önbelleğe yazılmayacak")
+    return response, finish_reason == 'length'
+
+
+def generate_detailed_description(category, user_input, use_cache=True):
     app.logger.info(f"Detaylandırma: {category}, {len(user_input)} karakter")
+    client = get_client()
     if not client:
         return None, "API yok"
 
+    user_input = truncate_tokens(user_input, MAX_USER_INPUT_TOKENS)
     prompt = f"""
 Bir YouTube içerik üreticisi için '{category}' kategorisinde bir video hazırlanıyor.
 Kullanıcının video özeti: '{user_input}'.
 Bu özeti SEO uyumlu, ilgi çekici açıklamaya dönüştür.
 Sadece açıklama metnini döndür.
 """
+    system_prompt = "Sen profesyonel YouTube SEO uzmanısın."
+    cache_key = make_llm_key("description", MODEL_NAME, system_prompt, prompt)
+    cached = cached_llm_result(cache_key, use_cache)
+    if cached is not None:
+        app.logger.info("Detaylandırma önbellekten")
+        return cached, None
+
     try:
-        time.sleep(0.5)
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "Sen profesyonel YouTube SEO uzmanısın."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-        )
+        with timed("description.openai"):
+            response, truncated = budgeted_completion(
+                "description", category, client,
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7
+            )
         if response and response.choices:
             result = response.choices[0].message.content.strip()
             app.logger.info(f"Detaylandırma OK: {len(result)} karakter")
+            if not truncated:
+                store_llm_result(cache_key, result)
             return result, None
         return None, "API yanıt yok"
     except Exception as e:
+        record_openai("description", error=True)
         app.logger.error(f"Detaylandırma hata: {e}")
         error_message = str(e)
         if "authentication" in error_message.lower():
@@ -293,19 +342,7 @@ Sadece açıklama metnini döndür.
         return None, f"API hatası: {error_message[:100]}"
 
 
-def generate_final_seo(category, detailed_description):
-    if not client:
-        return None, "API yok"
-
-    user_prompt = f"""
-Kategori: {category}
-Detaylı Açıklama: {detailed_description}
-
-Bu içerik için YouTube SEO optimizasyonu yap. Türkçe karakterleri doğru kullan.
-Yanıtını JSON formatında ver.
-"""
-
-    system_prompt = """
+SEO_SYSTEM_PROMPT = """
 Sen YouTube SEO uzmanısın.
 
 GÖREV: Türkçe, çarpıcı ve SEO uyumlu başlık, açıklama ve etiketler üret.
@@ -325,65 +362,135 @@ KURALLAR:
 }
 """
 
+
+def build_seo_messages(category, detailed_description):
+    detailed_description = truncate_tokens(detailed_description, MAX_DESCRIPTION_INPUT_TOKENS)
+    user_prompt = f"""
+Kategori: {category}
+Detaylı Açıklama: {detailed_description}
+
+Bu içerik için YouTube SEO optimizasyonu yap. Türkçe karakterleri doğru kullan.
+Yanıtını JSON formatında ver.
+"""
+    return [
+        {"role": "system", "content": SEO_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def finalize_seo_output(raw_output):
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.9,
-            max_tokens=2000
-        )
+        parsed_json = json.loads(raw_output)
+    except json.JSONDecodeError:
+        app.logger.error("JSON parse hatası")
+        return {
+            "title": ["❌ JSON Hatası"],
+            "description": raw_output,
+            "tags": ["hata"],
+            "seo_score": 0
+        }, False
+
+    return apply_seo_defaults(parsed_json), True
+
+
+def seo_cache_key(messages):
+    return make_llm_key("seo", MODEL_NAME, *(m["content"] for m in messages))
+
+
+def generate_final_seo(category, detailed_description, use_cache=True):
+    client = get_client()
+    if not client:
+        return None, "API yok"
+
+    messages = build_seo_messages(category, detailed_description)
+    cache_key = seo_cache_key(messages)
+    cached = cached_llm_result(cache_key, use_cache)
+    if cached is not None:
+        app.logger.info("SEO önbellekten")
+        return cached, None
+
+    try:
+        with timed("seo.openai"):
+            response, truncated = budgeted_completion(
+                "seo", category, client,
+                model=MODEL_NAME,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.9
+            )
         raw_output = response.choices[0].message.content.strip()
         app.logger.info("SEO çıktısı alındı")
         
-        try:
-            parsed_json = json.loads(raw_output)
-            if 'title' not in parsed_json or not parsed_json['title']:
-                parsed_json['title'] = ["🎯 Başlık Yok"]
-            if 'tags' not in parsed_json or not parsed_json['tags']:
-                parsed_json['tags'] = ["genel", "video"]
-            if 'description' not in parsed_json or not parsed_json['description']:
-                parsed_json['description'] = "Açıklama yok"
-            if 'seo_score' not in parsed_json:
-                score = 50
-                if len(parsed_json.get('title', [])) >= 3: score += 10
-                if len(parsed_json.get('tags', [])) >= 10: score += 12
-                if len(parsed_json.get('description', '').split()) >= 250: score += 15
-                parsed_json['seo_score'] = min(score, 95)
-            
+        parsed_json, valid = finalize_seo_output(raw_output)
+        if valid:
             app.logger.info(f"SEO OK: Skor {parsed_json['seo_score']}")
-            return parsed_json, None
-        except json.JSONDecodeError:
-            app.logger.error("JSON parse hatası")
-            return {
-                "title": ["❌ JSON Hatası"],
-                "description": raw_output,
-                "tags": ["hata"],
-                "seo_score": 0
-            }, None
+            if not truncated:
+                store_llm_result(cache_key, parsed_json)
+        return parsed_json, None
     except Exception as e:
+        record_openai("seo", error=True)
         app.logger.error(f"SEO hata: {e}")
         return None, f"API başarısız: {str(e)[:50]}"
 
 
-def generate_thumbnail_design(category, title, seo_score):
+def stream_final_seo(category, detailed_description, use_cache=True):
+    # (olay, veri) çiftleri üretir: her alan tamamlandıkça 'field', en sonda 'done' veya 'error'
+    client = get_client()
     if not client:
-        return None, "API yok"
+        yield "error", {"error": "API yok"}
+        return
 
-    user_prompt = f"""
-Video Kategorisi: {category}
-Video Başlığı: {title}
-SEO Skoru: {seo_score}
+    messages = build_seo_messages(category, detailed_description)
+    cache_key = seo_cache_key(messages)
+    cached = cached_llm_result(cache_key, use_cache)
+    if cached is not None:
+        app.logger.info("SEO önbellekten (akış)")
+        for field, value in cached.items():
+            yield "field", {"field": field, "value": value}
+        yield "done", cached
+        return
+
+    try:
+        started = time.perf_counter()
+        stream = openai_governor.chat_completion(
+            client,
+            model=MODEL_NAME,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0.9,
+            max_tokens=token_budget.max_tokens("seo_stream"),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parser = StreamingObjectParser()
+        chunks = []
+        finish_reason = None
+        for chunk in stream:
+            if getattr(chunk, 'usage', None):
+                record_llm_usage("seo_stream", category, chunk, started, finish_reason)
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            text = chunk.choices[0].delta.content or ""
+            chunks.append(text)
+            for field, value in parser.feed(text):
+                yield "field", {"field": field, "value": value}
+        
+        record_stage("seo.openai_stream", time.perf_counter() - started)
+        parsed_json, valid = finalize_seo_output("".join(chunks).strip())
+        if valid:
+            app.logger.info(f"SEO OK (akış): Skor {parsed_json['seo_score']}")
+            # Akışta alanlar gönderildiği için tekrar denenmez; kesik yanıt yalnızca önbelleğe yazılmaz
+            if finish_reason != 'length':
+                store_llm_result(cache_key, parsed_json)
+        yield "done", parsed_json
+    except Exception as e:
+        record_openai("seo_stream", error=True)
+        app.logger.error(f"SEO akış hata: {e}")
+        yield "error", {"error": f"API başarısız: {str(e)[:50]}"}
 
-Profesyonel YouTube thumbnail konsepti oluştur.
-ÖNEMLI: main_text için bu başlığı kullan: "{title}"
-JSON formatında ver.
-"""
 
-    system_prompt = """
+DESIGN_SYSTEM_PROMPT = """
 Sen thumbnail tasarımcısısın.
 
 ÇIKTI:
@@ -416,205 +523,507 @@ KURALLAR:
 5. ASLA emoji kullanma, sadece metin
 """
 
+
+def build_design_prompt(category, title, seo_score):
+    return f"""
+Video Kategorisi: {category}
+Video Başlığı: {title}
+SEO Skoru: {seo_score}
+
+Profesyonel YouTube thumbnail konsepti oluştur.
+ÖNEMLI: main_text için bu başlığı kullan: "{title}"
+JSON formatında ver.
+"""
+
+
+def design_cache_key(category, title, seo_score):
+    return make_llm_key("design", MODEL_NAME, DESIGN_SYSTEM_PROMPT, build_design_prompt(category, title, seo_score))
+
+
+def generate_thumbnail_design(category, title, seo_score, use_cache=True, deadline=None):
+    client = get_client()
+    if not client:
+        return None, "API yok"
+
+    system_prompt = DESIGN_SYSTEM_PROMPT
+    user_prompt = build_design_prompt(category, title, seo_score)
+    cache_key = design_cache_key(category, title, seo_score)
+    cached = cached_llm_result(cache_key, use_cache)
+    if cached is not None:
+        app.logger.info("Thumbnail tasarım önbellekten")
+        return cached, None
+
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.85,
-            max_tokens=700
-        )
+        with timed("design.openai"):
+            response, truncated = budgeted_completion(
+                "design", category, client,
+                deadline=deadline,
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.85
+            )
         raw_output = response.choices[0].message.content.strip()
         app.logger.info("Thumbnail tasarım alındı")
         
         try:
-            design_data = json.loads(raw_output)
-            if 'text_position' not in design_data:
-                design_data['text_position'] = 'center'
-            if 'emoji' not in design_data:
-                design_data['emoji'] = '🎯'
-            if 'effects' not in design_data:
-                design_data['effects'] = {'glow': True, 'shadow_intensity': 0.8, 'text_outline_width': 4}
+            design_data = apply_design_defaults(json.loads(raw_output))
+            if not truncated:
+                store_llm_result(cache_key, design_data)
             return design_data, None
         except json.JSONDecodeError:
             app.logger.error("Thumbnail JSON hatası")
             return None, "Tasarım oluşturulamadı"
     except Exception as e:
+        record_openai("design", error=True)
         app.logger.error(f"Thumbnail tasarım hata: {e}")
         return None, str(e)[:50]
 
 
-def create_thumbnail_image(design_data, category, title="", detailed_description=""):
+COMBINED_SYSTEM_PROMPT = f"""
+Sen profesyonel YouTube SEO uzmanı ve thumbnail tasarımcısısın.
+
+GÖREV: Tek JSON yanıtında üç bölüm üret:
+- "description": Kullanıcının özetini SEO uyumlu, ilgi çekici detaylı açıklamaya dönüştür (düz metin).
+- "seo": Bu açıklama için SEO paketi (SEO KURALLARI).
+- "design": "seo.title" listesindeki ilk başlık için thumbnail tasarımı (TASARIM KURALLARI).
+
+=== SEO KURALLARI ===
+{SEO_SYSTEM_PROMPT}
+=== TASARIM KURALLARI ===
+{DESIGN_SYSTEM_PROMPT}
+ÇIKTI:
+{{"description": "...", "seo": {{...}}, "design": {{...}}}}
+"""
+
+
+def generate_combined_pipeline(category, user_input, use_cache=True):
+    # Tek çağrı: açıklama döner; SEO ve tasarım, sonraki adımların kullandığı önbellek anahtarlarına yazılır
+    client = get_client()
+    if not client:
+        return None, "API yok"
+
+    user_input = truncate_tokens(user_input, MAX_USER_INPUT_TOKENS)
+    prompt = f"""
+Kategori: {category}
+Kullanıcının video özeti: '{user_input}'
+
+Türkçe karakterleri doğru kullan. Yanıtını JSON formatında ver.
+"""
+    cache_key = make_llm_key("pipeline", MODEL_NAME, COMBINED_SYSTEM_PROMPT, prompt)
+    bundle = cached_llm_result(cache_key, use_cache)
+    if bundle is not None:
+        app.logger.info("Birleşik üretim önbellekten")
+    else:
+        try:
+            with timed("pipeline.openai"):
+                response, truncated = budgeted_completion(
+                    "pipeline", category, client,
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": COMBINED_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.8
+                )
+            raw_output = response.choices[0].message.content.strip()
+        except Exception as e:
+            record_openai("pipeline", error=True)
+            app.logger.error(f"Birleşik üretim hata: {e}")
+            return None, f"API hatası: {str(e)[:100]}"
+        if truncated:
+            # Sonraki adımlar bu yanıtı önbellekten okuyacağı için kesik paket kullanılmaz
+            return None, "Birleşik yanıt kesik"
+
+        try:
+            description, seo_data, design_data = validate_combined(json.loads(raw_output))
+        except json.JSONDecodeError:
+            description = None
+        if not description:
+            app.logger.warning("Birleşik yanıtta açıklama yok")
+            return None, "Birleşik yanıt geçersiz"
+        bundle = {"description": description, "seo": seo_data, "design": design_data}
+        store_llm_result(cache_key, bundle)
+
+    seo_data = bundle["seo"]
+    store_llm_result(seo_cache_key(build_seo_messages(category, bundle["description"])), seo_data)
+    store_llm_result(design_cache_key(category, seo_data['title'][0], seo_data['seo_score']), bundle["design"])
+    app.logger.info(f"Birleşik üretim OK: Skor {seo_data['seo_score']}")
+    return bundle["description"], None
+
+
+def prepare_description(category, user_input, use_cache=True):
+    if PIPELINE_MODE == "combined" and llm_cache is not None:
+        description, error = generate_combined_pipeline(category, user_input, use_cache)
+        if not error:
+            return description, None
+        app.logger.warning(f"Birleşik üretim başarısız, aşamalı akışa geçiliyor: {error}")
+    return generate_detailed_description(category, user_input, use_cache)
+
+
+BATCH_DIR = os.getenv("BATCH_DIR", os.path.join('cache', 'batches'))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 4))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", 1000))
+# /batch CSRF'den muaf; yalnızca bu anahtarı taşıyan istemciler kullanabilir, tanımlı değilse kapalı
+BATCH_TOKEN = os.getenv("BATCH_TOKEN")
+
+stage_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("THUMBNAIL_STAGE_WORKERS", 8)),
+    thread_name_prefix="thumbnail-stage"
+)
+DESIGN_STAGE_TIMEOUT = float(os.getenv("DESIGN_STAGE_TIMEOUT", 45))
+BACKGROUND_STAGE_TIMEOUT = float(os.getenv("BACKGROUND_STAGE_TIMEOUT", 25))
+
+# Varyant kompozisyonu için süreç sayısı; 0 ise varyantlar render iş parçacığında sırayla çizilir
+VARIANT_WORKERS = int(os.getenv("VARIANT_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_VARIANTS = int(os.getenv("MAX_VARIANTS", 12))
+variant_pool = None
+variant_pool_lock = threading.Lock()
+
+GRADIENT_COLORS = [
+    ('#FF6B6B', '#4ECDC4'),
+    ('#667eea', '#764ba2'),
+    ('#f093fb', '#f5576c'),
+    ('#4facfe', '#00f2fe'),
+    ('#43e97b', '#38f9d7'),
+]
+
+
+def describe_background(background):
+    if background and background.info.get('source_path'):
+        return {'path': background.info['source_path']}
+    if background:
+        return {'url': background.info.get('source_url')}
+    return {'gradient': list(random.choice(GRADIENT_COLORS))}
+
+
+def run_thumbnail_stages(category, title, seo_score, detailed_description="", use_cache=True):
+    # Arka plan sorgusu tasarıma bağlı değil; LLM çağrısı ile eşzamanlı indir.
+    # Başlamış bir future iptal edilemez; çağrıların kendisi aşama süresinde kesilir
+    started = time.monotonic()
+    background_deadline = started + BACKGROUND_STAGE_TIMEOUT
+    design_deadline = started + DESIGN_STAGE_TIMEOUT
+    background_future = stage_executor.submit(
+        get_unsplash_image, category, title, detailed_description, background_deadline
+    )
+    design_future = stage_executor.submit(
+        generate_thumbnail_design, category, title, seo_score, use_cache, design_deadline
+    )
+    
+    try:
+        design_data, error = design_future.result(timeout=DESIGN_STAGE_TIMEOUT)
+    except FuturesTimeoutError:
+        app.logger.error("Thumbnail tasarım zaman aşımı")
+        return None, None, "Tasarım zaman aşımına uğradı"
+    
+    if error:
+        return None, None, error
+    
+    remaining = background_deadline - time.monotonic()
     try:
-        width, height = 1280, 720
+        background = background_future.result(timeout=max(remaining, 0))
+    except FuturesTimeoutError:
+        app.logger.warning("Arka plan zaman aşımı, gradient kullanılacak")
+        background = None
+    
+    return design_data, background, None
+
+
+def render_thumbnail_job(category, title, seo_score, detailed_description, use_cache=True):
+    design_data, background, error = run_thumbnail_stages(
+        category, title, seo_score, detailed_description, use_cache=use_cache
+    )
+    if error:
+        app.logger.error(f"Thumbnail tasarım hatası: {error}")
+        return None, error
+    
+    _, background_ref, error = create_thumbnail_image(
+        design_data, category, title, detailed_description,
+        background_ref=describe_background(background), background=background
+    )
+    if error:
+        app.logger.error(f"Thumbnail oluşturma hatası: {error}")
+        return None, error
+    
+    app.logger.info("Thumbnail başarılı")
+    return {
+        "design_data": design_data,
+        "background_ref": background_ref,
+        "thumbnail_key": make_thumbnail_key(design_data, background_ref)
+    }, None
+
+
+def create_thumbnail_image(design_data, category, title="", detailed_description="", background_ref=None, background=None):
+    try:
+        width, height = THUMBNAIL_SIZE
         app.logger.info(f"Thumbnail oluşturuluyor: {category}")
-        background = get_unsplash_image(category, title, detailed_description)
         
-        def hex_to_rgb(hex_color):
-            hex_color = hex_color.lstrip('#')
-            return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+        if background_ref is None:
+            if background is None:
+                background = get_unsplash_image(category, title, detailed_description)
+            background_ref = describe_background(background)
         
-        if background:
-            bg_width, bg_height = background.size
-            aspect = bg_width / bg_height
-            target_aspect = width / height
-            if aspect > target_aspect:
-                new_height = height
-                new_width = int(height * aspect)
-            else:
-                new_width = width
-                new_height = int(width / aspect)
-            background = background.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            left = (new_width - width) // 2
-            top = (new_height - height) // 2
-            background = background.crop((left, top, left + width, top + height))
-            enhancer = ImageEnhance.Contrast(background)
-            background = enhancer.enhance(1.3)
-            enhancer = ImageEnhance.Sharpness(background)
-            background = enhancer.enhance(1.2)
-        else:
-            background = Image.new('RGB', (width, height))
-            draw_bg = ImageDraw.Draw(background)
-            gradient_colors = [
-                ('#FF6B6B', '#4ECDC4'),
-                ('#667eea', '#764ba2'),
-                ('#f093fb', '#f5576c'),
-                ('#4facfe', '#00f2fe'),
-                ('#43e97b', '#38f9d7'),
-            ]
-            start_color, end_color = random.choice(gradient_colors)
-            start_rgb = hex_to_rgb(start_color)
-            end_rgb = hex_to_rgb(end_color)
-            for y in range(height):
-                ratio = y / height
-                r = int(start_rgb[0] + (end_rgb[0] - start_rgb[0]) * ratio)
-                g = int(start_rgb[1] + (end_rgb[1] - start_rgb[1]) * ratio)
-                b = int(start_rgb[2] + (end_rgb[2] - start_rgb[2]) * ratio)
-                draw_bg.rectangle([(0, y), (width, y + 1)], fill=(r, g, b))
-        
-        overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        draw_overlay = ImageDraw.Draw(overlay)
-        colors = design_data.get('colors', {})
-        overlay_start = hex_to_rgb(colors.get('overlay_start', '#000000'))
-        overlay_end = hex_to_rgb(colors.get('overlay_end', '#000000'))
-        overlay_opacity = colors.get('overlay_opacity', 0.75)
-        
-        for y in range(height):
-            ratio = y / height
-            center_ratio = abs(0.5 - ratio) * 3.0
-            adjusted_opacity = overlay_opacity + (center_ratio * 0.22)
-            r = int(overlay_start[0] + (overlay_end[0] - overlay_start[0]) * ratio)
-            g = int(overlay_start[1] + (overlay_end[1] - overlay_start[1]) * ratio)
-            b = int(overlay_start[2] + (overlay_end[2] - overlay_start[2]) * ratio)
-            alpha = int(255 * min(adjusted_opacity, 0.92))
-            draw_overlay.rectangle([(0, y), (width, y + 1)], fill=(r, g, b, alpha))
+        cache_key = make_thumbnail_key(design_data, background_ref)
+        cached = thumbnail_store.get(cache_key)
+        record_cache("thumbnail", cached is not None)
+        if cached is not None:
+            app.logger.info("Thumbnail önbellekten")
+            return io.BytesIO(cached), background_ref, None
         
-        background = background.convert('RGBA')
-        background = Image.alpha_composite(background, overlay)
-        background = background.convert('RGB')
+        if background is None and 'gradient' not in background_ref:
+            try:
+                with timed("background.download"):
+                    background = load_background_ref(background_ref)
+            except Exception as e:
+                app.logger.warning(f"Arka plan tekrar indirilemedi: {e}")
+                background_ref = {'gradient': list(random.choice(GRADIENT_COLORS))}
+                cache_key = make_thumbnail_key(design_data, background_ref)
         
-        draw = ImageDraw.Draw(background)
-        main_text = design_data.get('main_text', 'BAŞLIK').upper()
-        sub_text = design_data.get('sub_text', '')
-        emoji = ''  # ← Emoji'yi tamamen devre dışı bırak
+        with timed("render.background"):
+            if background:
+                background = prepare_background(background, THUMBNAIL_SIZE)
+            else:
+                background = gradient_background(background_ref['gradient'], THUMBNAIL_SIZE)
         
+        background = compose_thumbnail(design_data, background)
+        with timed("render.encode"):
+            outputs = encode_outputs(background)
+        for (output_width, fmt), data in outputs.items():
+            thumbnail_store.put(output_key(cache_key, output_width, fmt), data)
+        img_io = io.BytesIO(outputs[(MASTER_WIDTH, 'jpeg')])
+        app.logger.info("Thumbnail oluşturuldu")
+        return img_io, background_ref, None
+    except Exception as e:
+        app.logger.error(f"Thumbnail hata: {e}")
+        return None, background_ref, str(e)[:100]
+
+
+def get_variant_pool():
+    global variant_pool
+    if VARIANT_WORKERS <= 0:
+        return None
+    with variant_pool_lock:
+        if variant_pool is None:
+            # fork çok iş parçacıklı süreçte tutulu kilitleri de kopyalar; spawn temiz süreç başlatır
+            variant_pool = ProcessPoolExecutor(
+                max_workers=VARIANT_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return variant_pool
+
+
+def reset_variant_pool(pool):
+    global variant_pool
+    with variant_pool_lock:
+        if variant_pool is pool:
+            variant_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def record_render_stages(outputs, stages):
+    for stage, seconds in stages:
+        record_stage(stage, seconds)
+    return outputs
+
+
+def compose_variants(designs, frame, background_ref):
+    pool = get_variant_pool()
+    if pool is not None:
         try:
-            font_paths = [
-                "C:\\Windows\\Fonts\\impact.ttf",
-                "C:\\Windows\\Fonts\\IMPACTED.TTF",
-                "C:\\Windows\\Fonts\\ariblk.ttf",
-                "C:\\Windows\\Fonts\\ARLRDBD.TTF",
-                "C:\\Windows\\Fonts\\calibrib.ttf",
-                "C:\\Windows\\Fonts\\BAUHS93.TTF",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                "/System/Library/Fonts/Impact.ttf",
+            futures = [
+                pool.submit(render_outputs, design_data, frame, background_ref, THUMBNAIL_SIZE)
+                for design_data in designs
             ]
-            main_font = None
-            for font_path in font_paths:
+            results = []
+            for future in futures:
                 try:
-                    initial_size = 110
-                    test_font = ImageFont.truetype(font_path, initial_size)
-                    test_text = emoji + " " + main_text if emoji else main_text
-                    bbox = draw.textbbox((0, 0), test_text, font=test_font)
-                    text_width = bbox[2] - bbox[0]
-                    max_width = width - 120
-                    if text_width > max_width:
-                        scale = max_width / text_width
-                        new_size = int(initial_size * scale * 0.85)
-                        main_font = ImageFont.truetype(font_path, new_size)
-                    else:
-                        main_font = test_font
-                    app.logger.info(f"Font yüklendi: {font_path.split('/')[-1]}")
-                    break
-                except:
-                    continue
-            if not main_font:
-                main_font = ImageFont.load_default()
+                    results.append(record_render_stages(*future.result()))
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    app.logger.error(f"Varyant render hatası: {e}")
+                    results.append(None)
+            return results
+        except BrokenProcessPool:
+            app.logger.warning("Varyant süreç havuzu çöktü, varyantlar sırayla çizilecek")
+            reset_variant_pool(pool)
+    results = []
+    for design_data in designs:
+        try:
+            outputs, stages = render_outputs(design_data, frame, background_ref, THUMBNAIL_SIZE)
+            results.append(record_render_stages(outputs, stages))
+        except Exception as e:
+            app.logger.error(f"Varyant render hatası: {e}")
+            results.append(None)
+    return results
+
+
+def render_variants_job(category, titles, seo_score, detailed_description, styles=('default',), use_cache=True):
+    # Başlık başına tek tasarım çağrısı (paralel), tek arka plan indirmesi; stiller tasarımın üzerine uygulanır
+    started = time.monotonic()
+    background_deadline = started + BACKGROUND_STAGE_TIMEOUT
+    design_deadline = started + DESIGN_STAGE_TIMEOUT
+    with timed("render.variants"):
+        background_future = stage_executor.submit(
+            get_unsplash_image, category, titles[0], detailed_description, background_deadline
+        )
+        design_futures = [
+            stage_executor.submit(generate_thumbnail_design, category, title, seo_score, use_cache, design_deadline)
+            for title in titles
+        ]
+
+        designs = []
+        for title, future in zip(titles, design_futures):
+            remaining = design_deadline - time.monotonic()
             try:
-                sub_font = ImageFont.truetype(font_paths[0], 55)
-            except:
-                sub_font = ImageFont.load_default()
-        except:
-            main_font = ImageFont.load_default()
-            sub_font = ImageFont.load_default()
-        
-        text_color = hex_to_rgb(colors.get('text_main', '#FFFFFF'))
-        stroke_color = hex_to_rgb(colors.get('text_stroke', '#000000'))
-        effects = design_data.get('effects', {})
-        stroke_width = effects.get('text_outline_width', 7)
-        
-        emoji = ''
-        
-        full_text = f"{emoji} {main_text}" if emoji else main_text
-        bbox = draw.textbbox((0, 0), full_text, font=main_font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        text_position = design_data.get('text_position', 'center')
-        if text_position == 'center':
-            x = (width - text_width) // 2
-            y = (height - text_height) // 2
-        elif text_position == 'top':
-            x = (width - text_width) // 2
-            y = 80
-        elif text_position == 'bottom':
-            x = (width - text_width) // 2
-            y = height - text_height - 100
+                design_data, error = future.result(timeout=max(remaining, 0))
+            except FuturesTimeoutError:
+                design_data, error = None, "Tasarım zaman aşımına uğradı"
+            if error:
+                app.logger.warning(f"Varyant tasarımı atlandı ({title}): {error}")
+                continue
+            designs.append((title, design_data))
+
+        if not designs:
+            return None, "Tasarım oluşturulamadı"
+
+        remaining = background_deadline - time.monotonic()
+        try:
+            background = background_future.result(timeout=max(remaining, 0))
+        except FuturesTimeoutError:
+            app.logger.warning("Arka plan zaman aşımı, gradient kullanılacak")
+            background = None
+        background_ref = describe_background(background)
+
+        variants = []
+        pending = []
+        for title, design_data in designs:
+            for style in styles:
+                styled = apply_style(design_data, style)
+                key = make_thumbnail_key(styled, background_ref)
+                variants.append({
+                    "title": title,
+                    "style": style,
+                    "design_data": styled,
+                    "background_ref": background_ref,
+                    "thumbnail_key": key,
+                })
+                cached = thumbnail_store.get(key) is not None
+                record_cache("thumbnail", cached)
+                if not cached:
+                    pending.append(variants[-1])
+
+        if pending:
+            frame = None
+            if background is not None:
+                # Arka plan bir kez hazırlanır; süreçlere ham RGB karesi olarak gönderilir
+                with timed("render.background"):
+                    frame = prepare_background(background, THUMBNAIL_SIZE).tobytes()
+            results = compose_variants([variant["design_data"] for variant in pending], frame, background_ref)
+            for variant, outputs in zip(pending, results):
+                if outputs is None:
+                    variants.remove(variant)
+                    continue
+                for (output_width, fmt), data in outputs.items():
+                    thumbnail_store.put(output_key(variant["thumbnail_key"], output_width, fmt), data)
+
+    if not variants:
+        return None, "Thumbnail oluşturulamadı"
+    app.logger.info(f"Thumbnail varyantları hazır: {len(variants)}")
+    first = variants[0]
+    return {
+        "design_data": first["design_data"],
+        "background_ref": background_ref,
+        "thumbnail_key": first["thumbnail_key"],
+        "variants": variants,
+    }, None
+
+
+def process_batch_row(row, with_thumbnail=True):
+    category = row['category']
+    if not validate_category(category):
+        return {"status": "error", "error": "Geçersiz kategori"}
+    user_input = sanitize_input(row['summary'], max_length=1000)
+    if len(user_input) < 10:
+        return {"status": "error", "error": "En az 10 karakter girin"}
+
+    detailed_description, error = prepare_description(category, user_input)
+    if error:
+        return {"status": "error", "error": error}
+
+    seo_data, error = generate_final_seo(category, detailed_description)
+    if error:
+        return {"status": "error", "error": error}
+
+    title_data = seo_data.get('title', ['Başlık yok'])
+    title_list = title_data if isinstance(title_data, list) else [str(title_data)]
+    result = {
+        "status": "ok",
+        "category": category,
+        "detailed_description": detailed_description,
+        "title": title_list,
+        "description": seo_data.get('description', 'Açıklama yok'),
+        "tags": seo_data.get('tags', []),
+        "seo_score": seo_data.get('seo_score', 'N/A'),
+    }
+
+    if with_thumbnail:
+        design_data, background, error = run_thumbnail_stages(
+            category, title_list[0], result['seo_score'], detailed_description
+        )
+        if not error:
+            _, background_ref, error = create_thumbnail_image(
+                design_data, category, title_list[0], detailed_description,
+                background_ref=describe_background(background), background=background
+            )
+        if error:
+            result["thumbnail_error"] = error
         else:
-            x = 80
-            y = (height - text_height) // 2
-        
-        for offset_x in range(-stroke_width, stroke_width + 1):
-            for offset_y in range(-stroke_width, stroke_width + 1):
-                if offset_x*offset_x + offset_y*offset_y <= stroke_width*stroke_width:
-                    draw.text((x + offset_x, y + offset_y), full_text, font=main_font, fill=stroke_color)
-        draw.text((x, y), full_text, font=main_font, fill=text_color)
-        
-        if sub_text:
-            bbox_sub = draw.textbbox((0, 0), sub_text, font=sub_font)
-            sub_width = bbox_sub[2] - bbox_sub[0]
-            x_sub = (width - sub_width) // 2
-            y_sub = y + text_height + 30
-            for offset_x in range(-3, 4):
-                for offset_y in range(-3, 4):
-                    if offset_x*offset_x + offset_y*offset_y <= 9:
-                        draw.text((x_sub + offset_x, y_sub + offset_y), sub_text, font=sub_font, fill=stroke_color)
-            draw.text((x_sub, y_sub), sub_text, font=sub_font, fill=text_color)
-        
-        background = background.filter(ImageFilter.SHARPEN)
-        img_io = io.BytesIO()
-        background.save(img_io, 'JPEG', quality=95)
-        img_io.seek(0)
-        img_base64 = base64.b64encode(img_io.getvalue()).decode('utf-8')
-        app.logger.info("Thumbnail oluşturuldu")
-        return img_io, img_base64, None
-    except Exception as e:
-        app.logger.error(f"Thumbnail hata: {e}")
-        return None, None, str(e)[:100]
+            result["thumbnail_key"] = make_thumbnail_key(design_data, background_ref)
+    return result
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = metrics.start_request()
 
+@app.after_request
+def add_server_timing(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        response.headers['Server-Timing'] = metrics.finish_request(
+            started, request.endpoint, request.method, response.status_code
+        )
+    return response
+
+@app.route('/healthz')
+@limiter.exempt
+def healthz():
+    # Kısa bir OpenAI kesintisi worker'ı düşürmesin; yoklama beklemez, önbellekteki durumu döner
+    schedule_openai_recheck()
+    status = dict(openai_status)
+    healthy = status["state"] != "failed"
+    return {"status": "ok" if healthy else "degraded", "openai": status}
+
+@app.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return "Yetkisiz", 401
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/stats/openai')
+@limiter.limit("60 per minute")
+def openai_stats():
+    return openai_governor.stats()
+
+@app.route('/api/stats/tokens')
+@limiter.limit("60 per minute")
+def token_stats():
+    return token_budget.stats()
 
 @app.route('/', methods=['GET', 'POST'])
 @limiter.limit("300 per minute") 
@@ -645,7 +1054,9 @@ def detay():
             return render_template('detay.html', category=category, error_message="En az 10 karakter girin")
 
         app.logger.info(f"Detaylandırma başlatılıyor: {len(user_input)} karakter")
-        detailed_description, error = generate_detailed_description(category, user_input)
+        detailed_description, error = prepare_description(
+            category, user_input, use_cache=not request.form.get('fresh')
+        )
 
         if error:
             app.logger.error(f"Detaylandırma hatası: {error}")
@@ -657,6 +1068,8 @@ def detay():
         session['detailed_description'] = detailed_description
         session.modified = True
         app.logger.info("Detaylandırma başarılı")
+        if SEO_STREAMING:
+            return redirect(url_for('optimize_live'))
         return redirect(url_for('optimize'))
 
     return render_template('detay.html', category=category, error_message=error_message_from_url)
@@ -671,7 +1084,14 @@ def optimize():
         app.logger.warning("Session verisi eksik")
         return redirect(url_for('detay', error_message="Oturum verisi eksik"))
 
-    seo_data, error = generate_final_seo(category, detailed_description)
+    use_cache = not request.args.get('fresh')
+    result_id = session.pop('seo_result_id', None)
+    seo_data = seo_results.get(result_id) if result_id and use_cache else None
+    error = None
+    if seo_data is not None:
+        app.logger.info("SEO akış sonucundan")
+    else:
+        seo_data, error = generate_final_seo(category, detailed_description, use_cache=use_cache)
 
     if error:
         app.logger.error(f"SEO hatası: {error}")
@@ -689,6 +1109,7 @@ def optimize():
     seo_score = seo_data.get('seo_score', 'N/A')
     
     session['title_first'] = title_first
+    session['titles'] = [str(title) for title in title_list]
     session['seo_score'] = seo_score
     
     app.logger.info(f"SEO başarılı - Skor: {seo_score}")
@@ -704,6 +1125,40 @@ def optimize():
         seo_score=seo_score
     )
 
+@app.route('/optimize/live')
+@limiter.limit("150 per minute")
+def optimize_live():
+    category = session.get('category')
+    if not category or not session.get('detailed_description'):
+        app.logger.warning("Session verisi eksik")
+        return redirect(url_for('detay', error_message="Oturum verisi eksik"))
+    return render_template('optimize_stream.html', category=category)
+
+@app.route('/optimize/stream')
+@limiter.limit("150 per minute")
+def optimize_stream():
+    category = session.get('category')
+    detailed_description = session.get('detailed_description')
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+    if not category or not detailed_description:
+        app.logger.warning("Session verisi eksik")
+        return Response(format_sse("error", {"error": "Oturum verisi eksik"}),
+                        mimetype='text/event-stream', headers=headers)
+
+    use_cache = not request.args.get('fresh')
+    # Akış başlamadan oturuma yazılır; yanıt gövdesi akarken oturum artık kaydedilmez
+    result_id = uuid.uuid4().hex
+    session['seo_result_id'] = result_id
+
+    def events():
+        for event, data in stream_final_seo(category, detailed_description, use_cache):
+            if event == "done":
+                seo_results.set(result_id, data)
+            yield format_sse(event, data)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=headers)
+
 @app.route('/generate-thumbnail', methods=['POST'])
 @limiter.limit("100 per minute")
 @csrf.exempt
@@ -723,33 +1178,183 @@ def generate_thumbnail():
             app.logger.warning("Thumbnail: Başlık yok")
             return {"error": "Başlık bulunamadı"}, 400
         
-        design_data, error = generate_thumbnail_design(category, title_first, seo_score)
-        
-        if error:
-            app.logger.error(f"Thumbnail tasarım hatası: {error}")
-            return {"error": error}, 500
-        
-        img_io, img_base64, error = create_thumbnail_image(
-            design_data, category, title_first, session.get('detailed_description', '')
-        )
-        
-        if error:
-            app.logger.error(f"Thumbnail oluşturma hatası: {error}")
-            return {"error": error}, 500
+        if 'job_owner' not in session:
+            session['job_owner'] = uuid.uuid4().hex
         
-        session['thumbnail_design'] = design_data
-        app.logger.info("Thumbnail başarılı")
+        try:
+            if data.get('variants'):
+                titles = [title_first] if custom_title else list(session.get('titles') or [title_first])
+                styles = data.get('styles') or ['default']
+                if not isinstance(styles, list) or any(style not in THUMBNAIL_STYLES for style in styles):
+                    return {"error": "Geçersiz stil"}, 400
+                styles = list(dict.fromkeys(styles))
+                if len(titles) * len(styles) > MAX_VARIANTS:
+                    return {"error": f"En fazla {MAX_VARIANTS} varyant oluşturulabilir"}, 400
+                job_id = render_jobs.submit(
+                    render_variants_job,
+                    category, titles, seo_score, session.get('detailed_description', ''),
+                    styles, not data.get('fresh'),
+                    owner=session['job_owner']
+                )
+            else:
+                job_id = render_jobs.submit(
+                    render_thumbnail_job,
+                    category, title_first, seo_score, session.get('detailed_description', ''),
+                    not data.get('fresh'),
+                    owner=session['job_owner']
+                )
+        except OwnerQueueFull:
+            app.logger.warning("Oturumun render kuyruğu dolu")
+            return {"error": "Önceki thumbnail işleriniz bitmeden yenisi başlatılamaz"}, 429
+        except QueueFull:
+            app.logger.warning("Render kuyruğu dolu")
+            return {"error": "Sistem yoğun, lütfen tekrar deneyin"}, 503
         
+        app.logger.info(f"Thumbnail işi kuyrukta: {job_id}")
         return {
             "success": True,
-            "image_base64": img_base64,
-            "design_data": design_data
-        }
+            "job_id": job_id,
+            "status_url": url_for('thumbnail_job_status', job_id=job_id)
+        }, 202
         
     except Exception as e:
         app.logger.error(f"Thumbnail genel hatası: {e}", exc_info=True)
         return {"error": "Thumbnail oluşturulamadı"}, 500
 
+@app.route('/thumbnail-jobs/<job_id>')
+@limiter.limit("600 per minute")
+def thumbnail_job_status(job_id):
+    job = render_jobs.get(job_id, owner=session.get('job_owner'))
+    if job is None:
+        return {"error": "İş bulunamadı"}, 404
+    
+    if job['status'] == 'error':
+        return {"status": "error", "error": job['error']}
+    if job['status'] != 'done':
+        return {"status": job['status']}
+    
+    result = job['result']
+    session['thumbnail_design'] = result['design_data']
+    session['thumbnail_background'] = result['background_ref']
+    response = {
+        "status": "done",
+        "success": True,
+        **thumbnail_urls(result['thumbnail_key']),
+        "design_data": result['design_data']
+    }
+    if 'variants' in result:
+        response['variants'] = [
+            {"title": variant['title'], "style": variant['style'], **thumbnail_urls(variant['thumbnail_key'])}
+            for variant in result['variants']
+        ]
+    return response
+
+@app.route('/batch', methods=['POST'])
+@limiter.limit("20 per hour")
+@csrf.exempt
+def batch():
+    if not BATCH_TOKEN or request.headers.get('Authorization') != f"Bearer {BATCH_TOKEN}":
+        return {"error": "Yetkisiz"}, 401
+
+    upload = request.files.get('file')
+    batch_id = request.form.get('batch_id', '').strip()
+    with_thumbnail = request.form.get('thumbnails', 'true').lower() == 'true'
+
+    try:
+        if upload:
+            rows = parse_batch_upload(upload.filename, upload.read(), max_rows=BATCH_MAX_ROWS)
+            ledger = BatchLedger(BATCH_DIR, batch_id_for(rows))
+            ledger.save_rows(rows)
+        elif re.fullmatch(r'[0-9a-f]{24}', batch_id):
+            ledger = BatchLedger(BATCH_DIR, batch_id)
+            rows = ledger.load_rows()
+            if rows is None:
+                return {"error": "Toplu iş bulunamadı"}, 404
+        else:
+            return {"error": "JSONL veya CSV dosyası gerekli"}, 400
+    except BatchError as e:
+        return {"error": str(e)}, 400
+
+    owner = get_remote_address()
+    try:
+        lease = batch_runner.acquire(owner)
+    except BatchBusy as e:
+        return {"error": str(e)}, 429
+    app.logger.info(f"Toplu iş başladı: {ledger.batch_id}, {len(rows)} satır")
+
+    def process_row(row):
+        return process_batch_row(row, with_thumbnail)
+
+    def lines():
+        for result in batch_runner.run(rows, process_row, ledger, lease):
+            if result.get('thumbnail_key'):
+                urls = thumbnail_urls(result['thumbnail_key'])
+                result['thumbnail_url'] = urls['image_url']
+                result['preview_url'] = urls['preview_url']
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        app.logger.info(f"Toplu iş bitti: {ledger.batch_id}")
+
+    response = Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+    # Yanıt hiç okunmadan kapansa da yuva geri verilir
+    response.call_on_close(lambda: batch_runner.release(lease))
+    return response
+
+def thumbnail_variant(key, width, fmt):
+    variant_key = output_key(key, width, fmt)
+    data = thumbnail_store.get(variant_key)
+    if data is None and variant_key != key:
+        # Render sırasında kodlanmamış biçim/boyut: ana JPEG'den bir kez türetilip saklanır
+        master = thumbnail_store.get(key)
+        if master is None:
+            return None
+        data = encode_from_master(master, width, fmt)
+        thumbnail_store.put(variant_key, data)
+    return data
+
+def thumbnail_urls(key):
+    def url(width):
+        return url_for('thumbnail_image', key=key if width == MASTER_WIDTH else f"{key}-{width}")
+    return {
+        "image_url": url(MASTER_WIDTH),
+        # Uzantısız adres Accept'e göre WebP dönebilir; indirme her zaman JPEG olsun
+        "download_url": url_for('thumbnail_image', key=f"{key}.jpg"),
+        "preview_url": url(PREVIEW_WIDTH),
+        "srcset": ", ".join(f"{url(width)} {width}w" for width in reversed(OUTPUT_WIDTHS)),
+    }
+
+def accepts_webp():
+    return any(mimetype == 'image/webp' and quality > 0 for mimetype, quality in request.accept_mimetypes)
+
+@app.route('/thumbnails/<key>')
+@limiter.limit("600 per minute")
+def thumbnail_image(key):
+    # "<key>-640" önizleme boyutunu seçer; uzantısız adres Accept başlığına göre WebP/JPEG döner
+    match = re.fullmatch(r'([0-9a-f]{64})(?:-(\d+))?(?:\.(jpg|webp))?', key)
+    if not match:
+        return "Thumbnail bulunamadı", 404
+    key, width, extension = match.groups()
+    width = int(width) if width else MASTER_WIDTH
+    if width not in OUTPUT_WIDTHS:
+        return "Thumbnail bulunamadı", 404
+    if extension:
+        fmt = 'jpeg' if extension == 'jpg' else 'webp'
+    else:
+        fmt = 'webp' if accepts_webp() else 'jpeg'
+    
+    data = thumbnail_variant(key, width, fmt)
+    if data is None:
+        return "Thumbnail bulunamadı", 404
+    
+    # Anahtar render girdilerinin özeti olduğundan içerik değişmez; güçlü ETag ve uzun önbellek güvenli
+    response = Response(data, mimetype=f'image/{fmt}')
+    response.set_etag(f"{key}-{width}-{fmt}")
+    response.cache_control.public = True
+    response.cache_control.max_age = THUMBNAIL_MAX_AGE
+    response.cache_control.immutable = True
+    if not extension:
+        response.vary.add('Accept')
+    return response.make_conditional(request)
+
 @app.route('/download-thumbnail')
 @limiter.limit("200 per minute")
 def download_thumbnail():
@@ -764,7 +1369,8 @@ def download_thumbnail():
             return "Thumbnail bulunamadı", 404
         
         img_io, _, error = create_thumbnail_image(
-            design_data, category, title_first, detailed_description
+            design_data, category, title_first, detailed_description,
+            background_ref=session.get('thumbnail_background')
         )
         
         if error:
@@ -786,6 +1392,70 @@ def download_thumbnail():
         return "Thumbnail indirilemedi", 500
 
 
+def init_app():
+    # Dosya/SQLite açan ve iş parçacığı başlatan her şey burada; varyant süreçleri bunları çalıştırmaz
+    global thumbnail_store, llm_cache, openai_governor, token_budget, render_jobs, background_pool, seo_results
+    global batch_runner
+    workers = configured_workers()
+    if workers > 1 and SHARED_STATE_DIR is None:
+        # İş durumu ve thumbnail'ler worker'a özel kalır; istekler başka worker'a düşünce 404 alınır
+        print(f"[FATAL]: {workers} worker için SHARED_STATE_DIR gerekli; tek worker ile çalıştırın veya ayarlayın")
+        sys.exit(1)
+    if not os.path.exists('logs'):
+        os.mkdir('logs')
+    file_handler = RotatingFileHandler('logs/app.log', maxBytes=10240000, backupCount=10, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+    ))
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.setLevel(logging.INFO)
+    app.logger.info('YouTube Otomasyonu başlatıldı')
+
+    session_interface = session_interface_from_env()
+    if session_interface is not None:
+        app.session_interface = session_interface
+    limiter.init_app(app)
+
+    thumbnail_store = store_from_env()
+    llm_cache = llm_cache_from_env()
+    if PIPELINE_MODE == "combined" and llm_cache is None:
+        app.logger.warning("PIPELINE_MODE=combined LLM önbelleği olmadan çalışmaz; aşamalı akış kullanılacak")
+    openai_governor = governor_from_env()
+    token_budget = budget_from_env()
+    render_jobs = jobs_from_env()
+    # Akışla üretilen SEO sonucu /optimize'a yeniden çağrı yapılmadan devredilir
+    seo_results = LLMCache(
+        ttl=int(os.getenv("SEO_RESULT_TTL", 600)),
+        max_items=int(os.getenv("SEO_RESULT_MAX_ITEMS", 1024)),
+        db_path=shared_path('seo_results.sqlite3'),
+    )
+    # Etkin toplu işler paylaşımlı modda tüm worker'larda sayılır
+    batch_runner = BatchRunner(
+        workers=BATCH_WORKERS,
+        max_batches=int(os.getenv("BATCH_MAX_ACTIVE", 4)),
+        max_per_owner=int(os.getenv("BATCH_MAX_PER_OWNER", 1)),
+        db_path=shared_path('batches.sqlite3'),
+    )
+    metrics.registry.start_snapshots()
+
+    if not API_KEY:
+        app.logger.error("[✗] OPENAI_API_KEY tanımlı değil")
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+    background_pool = pool_from_env(UNSPLASH_ACCESS_KEY, THUMBNAIL_SIZE)
+    if background_pool:
+        for terms in background_index.default_queries():
+            background_pool.prefetch(terms + ",high contrast")
+        app.logger.info(f"Arka plan havuzu aktif: {background_pool.per_query} görsel/sorgu")
+
+
+# spawn ile başlayan varyant süreçleri `python app.py` altında bu dosyayı '__mp_main__' adıyla yeniden
+# yükler; orada yalnızca tanımlar gerekir
+if __name__ != '__mp_main__':
+    init_app()
+
+
 if __name__ == '__main__':
     debug_mode = os.getenv("FLASK_DEBUG", "False").lower() == "true"
     
@@ -0,0 +1,225 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+import http_client
+from background_prep import unsplash_sized_url
+from lazy_imports import lazy_import
+from shared_state import connect, shared_path
+
+Image = lazy_import('PIL.Image')
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+class UnsplashSource:
+    def __init__(self, access_key, size=(1280, 720)):
+        self.access_key = access_key
+        self.size = size
+
+    def fetch(self, query):
+        response = http_client.get(
+            f"{http_client.UNSPLASH_API_URL}/photos/random",
+            params={"query": query, "orientation": "landscape", "client_id": self.access_key},
+        )
+        response.raise_for_status()
+        image_url = unsplash_sized_url(response.json()['urls'], self.size)
+        img_response = http_client.get(image_url)
+        img_response.raise_for_status()
+        return img_response.content, {'url': image_url}
+
+
+class DirectorySource:
+    # Testlerde Unsplash yerine yerel klasör; sorguya ait alt klasör varsa oradan seçer
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _files(self, directory):
+        try:
+            return [
+                os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+        except OSError:
+            return []
+
+    def fetch(self, query):
+        subdir = os.path.join(self.directory, query.split(',')[0].strip().replace(' ', '_'))
+        files = self._files(subdir) or self._files(self.directory)
+        if not files:
+            raise FileNotFoundError(f"{self.directory} içinde görsel yok")
+        path = random.choice(files)
+        with open(path, 'rb') as f:
+            return f.read(), {'path': path}
+
+
+class BackgroundPool:
+    # Havuzun durumu disktedir: aynı dizini kullanan worker'lar görseli os.rename ile sahiplenir,
+    # böylece bir dosya yalnızca bir worker'a verilir; doldurma sorgu başına tek worker'da çalışır
+    FILL_LEASE = 120
+    CLAIM_MAX_AGE = 3600
+
+    def __init__(self, source, directory, per_query=3):
+        self.source = source
+        self.directory = directory
+        self.per_query = per_query
+        self.claim_dir = os.path.join(directory, '.claimed')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        os.makedirs(self.claim_dir, exist_ok=True)
+        self._db = connect(os.path.join(directory, 'fills.sqlite3'))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fill_leases ("
+            "query TEXT PRIMARY KEY, owner INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._sweep_claims()
+        self._worker = threading.Thread(target=self._run, name="background-prefetch", daemon=True)
+        self._worker.start()
+
+    def _query_dir(self, query):
+        return os.path.join(self.directory, hashlib.sha1(query.encode('utf-8')).hexdigest()[:16])
+
+    def _sweep_claims(self):
+        # Okunurken çöken süreçlerden kalan sahiplenilmiş dosyalar
+        now = time.time()
+        for entry in os.scandir(self.claim_dir):
+            try:
+                if now - entry.stat().st_mtime > self.CLAIM_MAX_AGE:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+    def _images(self, query):
+        try:
+            return sorted(
+                entry.path for entry in os.scandir(self._query_dir(query)) if entry.name.endswith('.img')
+            )
+        except OSError:
+            return []
+
+    def available(self, query):
+        return len(self._images(query))
+
+    def prefetch(self, query):
+        with self._lock:
+            if query in self._pending:
+                return
+            self._pending.add(query)
+        self._queue.put(query)
+
+    def _claim(self, query):
+        for image_path in self._images(query):
+            claimed = os.path.join(self.claim_dir, f"{os.getpid()}-{uuid.uuid4().hex}.img")
+            try:
+                os.rename(image_path, claimed)
+            except OSError:
+                # Başka bir worker önce aldı
+                continue
+            meta_path = image_path[:-4] + '.json'
+            try:
+                with open(meta_path, encoding='utf-8') as f:
+                    ref = json.load(f)['ref']
+            except (OSError, ValueError, KeyError):
+                ref = {}
+            self._discard(meta_path)
+            return claimed, ref
+        return None
+
+    def take(self, query):
+        entry = self._claim(query)
+        self.prefetch(query)
+        if entry is None:
+            return None
+
+        image_path, ref = entry
+        try:
+            # Çözme render sırasında hedef boyuta göre (JPEG draft) yapılır
+            with open(image_path, 'rb') as f:
+                img = Image.open(io.BytesIO(f.read()))
+        except OSError as e:
+            logger.warning(f"Havuz görseli okunamadı: {e}")
+            return None
+        finally:
+            self._discard(image_path)
+
+        if 'url' in ref:
+            img.info['source_url'] = ref['url']
+        if 'path' in ref:
+            img.info['source_path'] = ref['path']
+        return img
+
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _acquire_fill(self, query):
+        now = time.time()
+        row = self._db.execute(
+            "INSERT INTO fill_leases (query, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(query) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE expires_at <= ? RETURNING owner",
+            (query, os.getpid(), now + self.FILL_LEASE, now),
+        ).fetchone()
+        return row is not None
+
+    def _release_fill(self, query):
+        self._db.execute("DELETE FROM fill_leases WHERE query = ? AND owner = ?", (query, os.getpid()))
+
+    def _fill(self, query):
+        if not self._acquire_fill(query):
+            return
+        try:
+            while self.available(query) < self.per_query:
+                data, ref = self.source.fetch(query)
+                query_dir = self._query_dir(query)
+                os.makedirs(query_dir, exist_ok=True)
+                # Ad sırası alım sırasıdır; görsel en son ve tek adımda görünür olur
+                base = os.path.join(query_dir, f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}")
+                with open(base + '.json', 'w', encoding='utf-8') as f:
+                    json.dump({'query': query, 'ref': ref}, f, ensure_ascii=False)
+                with open(base + '.img.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(base + '.img.tmp', base + '.img')
+        finally:
+            self._release_fill(query)
+
+    def _run(self):
+        while True:
+            query = self._queue.get()
+            try:
+                self._fill(query)
+            except Exception as e:
+                logger.warning(f"Arka plan ön yüklemesi başarısız ({query}): {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(query)
+
+
+def pool_from_env(unsplash_access_key, size=(1280, 720)):
+    per_query = int(os.getenv("BACKGROUND_POOL_SIZE", 0))
+    if per_query <= 0:
+        return None
+
+    source_dir = os.getenv("BACKGROUND_SOURCE_DIR")
+    if source_dir:
+        source = DirectorySource(source_dir)
+    elif unsplash_access_key:
+        source = UnsplashSource(unsplash_access_key, size)
+    else:
+        return None
+
+    directory = os.getenv("BACKGROUND_POOL_DIR", shared_path('backgrounds', os.path.join('cache', 'backgrounds')))
+    return BackgroundPool(source, directory, per_query=per_query)
@@ -0,0 +1,74 @@
+import math
+from urllib.parse import urlencode
+
+from lazy_imports import lazy_import
+
+Image = lazy_import('PIL.Image')
+ImageFilter = lazy_import('PIL.ImageFilter')
+
+
+# reduce() ile kabaca küçültüp kalan kısmı LANCZOS ile yapar; kalite farkı gözle görülmez
+REDUCING_GAP = 3.0
+# Unsplash (imgix) sunucu tarafında kırpıp küçültür; sıkıştırma son JPEG'de tekrar yapılır
+UNSPLASH_QUALITY = 85
+
+
+def unsplash_sized_url(urls, size):
+    raw = urls.get('raw')
+    if not raw:
+        return urls['regular']
+    width, height = size
+    params = urlencode({'w': width, 'h': height, 'fit': 'crop', 'crop': 'entropy', 'fm': 'jpg', 'q': UNSPLASH_QUALITY})
+    return raw + ('&' if '?' in raw else '?') + params
+
+
+def cover_box(source_size, size):
+    # Hedef en-boy oranındaki en büyük ortalanmış bölge; önce kırpıp sonra ölçeklemek için
+    source_width, source_height = source_size
+    width, height = size
+    if source_width * height > source_height * width:
+        crop_width = source_height * width / height
+        left = (source_width - crop_width) / 2
+        return (left, 0, left + crop_width, source_height)
+    crop_height = source_width * height / width
+    top = (source_height - crop_height) / 2
+    return (0, top, source_width, top + crop_height)
+
+
+def _contrast_table(image, factor):
+    # ImageEnhance.Contrast ile aynı: gri ortalama etrafında doğrusal germe, tek LUT geçişinde
+    histogram = image.histogram()
+    means = []
+    for band in range(3):
+        counts = histogram[band * 256:(band + 1) * 256]
+        total = sum(counts) or 1
+        means.append(sum(i * c for i, c in enumerate(counts)) / total)
+    mean = int(means[0] * 0.299 + means[1] * 0.587 + means[2] * 0.114 + 0.5)
+    table = [max(0, min(255, int(mean + factor * (v - mean) + 0.5))) for v in range(256)]
+    return table * 3
+
+
+def _sharpness_kernel(factor):
+    # ImageEnhance.Sharpness = factor * görüntü - (factor - 1) * SMOOTH; tek 3x3 çekirdeğe indirgenir
+    smooth = (1, 1, 1, 1, 5, 1, 1, 1, 1)
+    weights = [-(factor - 1) * w for w in smooth]
+    weights[4] += factor * 13
+    return ImageFilter.Kernel((3, 3), weights, scale=13)
+
+
+def prepare_background(image, size, contrast=1.3, sharpness=1.2):
+    width, height = size
+    source_width, source_height = image.size
+    scale = max(width / source_width, height / source_height)
+    # JPEG'lerde DCT ölçekleme ile doğrudan küçük çöz; gereken kaplama boyutunun altına inmez
+    image.draft('RGB', (math.ceil(source_width * scale), math.ceil(source_height * scale)))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    box = cover_box(image.size, size)
+    image = image.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=REDUCING_GAP)
+    if contrast != 1:
+        image = image.point(_contrast_table(image, contrast))
+    if sharpness != 1:
+        image = image.filter(_sharpness_kernel(sharpness))
+    return image
@@ -0,0 +1,214 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from shared_state import connect
+
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ('summary', 'user_input', 'ozet', 'özet')
+
+
+class BatchError(ValueError):
+    pass
+
+
+class BatchBusy(Exception):
+    pass
+
+
+def _normalize_row(index, record):
+    if not isinstance(record, dict):
+        raise BatchError(f"{index + 1}. satır nesne değil")
+    summary = next((record[f] for f in SUMMARY_FIELDS if record.get(f)), '')
+    return {
+        "row": index,
+        "id": str(record.get('id') or index + 1),
+        "category": str(record.get('category') or '').strip(),
+        "summary": str(summary),
+    }
+
+
+def parse_batch_upload(filename, data, max_rows=1000):
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise BatchError("Dosya UTF-8 olmalı")
+
+    if (filename or '').lower().endswith('.csv'):
+        records = list(csv.DictReader(io.StringIO(text)))
+    else:
+        records = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise BatchError(f"{number}. satır geçerli JSON değil")
+
+    if not records:
+        raise BatchError("Dosyada satır yok")
+    if len(records) > max_rows:
+        raise BatchError(f"En fazla {max_rows} satır işlenebilir")
+    return [_normalize_row(i, r) for i, r in enumerate(records)]
+
+
+def batch_id_for(rows):
+    payload = json.dumps([[r['id'], r['category'], r['summary']] for r in rows], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+class BatchLedger:
+    # Tamamlanan satırları diske ekler; aynı toplu iş tekrar gönderilirse kaldığı yerden devam eder
+    def __init__(self, directory, batch_id):
+        self.batch_id = batch_id
+        self.rows_path = os.path.join(directory, f"{batch_id}.rows.json")
+        self.results_path = os.path.join(directory, f"{batch_id}.ndjson")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def save_rows(self, rows):
+        if not os.path.exists(self.rows_path):
+            with open(self.rows_path, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False)
+
+    def load_rows(self):
+        try:
+            with open(self.rows_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def completed(self):
+        results = {}
+        try:
+            with open(self.results_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue
+                    results[result['row']] = result
+        except OSError:
+            pass
+        return results
+
+    def record(self, result):
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.results_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class BatchRunner:
+    # Tüm toplu işler tek havuzu paylaşır; her iş aynı anda en fazla `window` satırı kuyruğa koyar,
+    # böylece uzun bir iş sonradan gelenleri bekletmez. Paylaşımlı modda etkin işler SQLite'ta sayılır,
+    # sınırlar tüm worker'lar için geçerlidir; kayıt her satırda yenilenir, çöken worker'ınki süresi dolunca düşer
+    LEASE_SECONDS = 300
+
+    def __init__(self, workers=4, max_batches=4, max_per_owner=1, window=None, db_path=None):
+        self.workers = workers
+        self.max_batches = max_batches
+        self.max_per_owner = max_per_owner
+        self.window = window or workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        self._active = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS active_batches ("
+                "id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _check(self, total, mine):
+        if total >= self.max_batches:
+            raise BatchBusy("Toplu iş kuyruğu dolu")
+        if mine >= self.max_per_owner:
+            raise BatchBusy("Devam eden toplu işiniz var")
+
+    def acquire(self, owner):
+        lease = uuid.uuid4().hex
+        with self._lock:
+            if self._db is None:
+                owners = list(self._active.values())
+                self._check(len(owners), owners.count(owner))
+                self._active[lease] = owner
+                return lease
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM active_batches WHERE expires_at <= ?", (now,))
+                total, mine = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(owner = ?), 0) FROM active_batches", (owner,)
+                ).fetchone()
+                self._check(total, mine)
+                self._db.execute(
+                    "INSERT INTO active_batches (id, owner, expires_at) VALUES (?, ?, ?)",
+                    (lease, owner, now + self.LEASE_SECONDS),
+                )
+            finally:
+                self._db.execute("COMMIT")
+        return lease
+
+    def _renew(self, lease):
+        if self._db is None or lease is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "UPDATE active_batches SET expires_at = ? WHERE id = ?", (time.time() + self.LEASE_SECONDS, lease)
+            )
+
+    def release(self, lease):
+        with self._lock:
+            self._active.pop(lease, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM active_batches WHERE id = ?", (lease,))
+
+    def run(self, rows, process_row, ledger, lease=None):
+        done = ledger.completed()
+        pending = [r for r in rows if r['row'] not in done]
+
+        yield {"batch_id": ledger.batch_id, "total": len(rows), "resumed": len(rows) - len(pending)}
+        for row in rows:
+            if row['row'] in done:
+                yield dict(done[row['row']], resumed=True)
+
+        queue = iter(pending)
+        futures = {}
+        try:
+            for row in queue:
+                futures[self._executor.submit(process_row, row)] = row
+                if len(futures) >= self.window:
+                    break
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Toplu iş satır hatası ({row['id']}): {e}")
+                        result = {"status": "error", "error": str(e)[:100]}
+                    result = dict(result, row=row['row'], id=row['id'])
+                    if result.get('status') == 'ok':
+                        ledger.record(result)
+                    next_row = next(queue, None)
+                    if next_row is not None:
+                        futures[self._executor.submit(process_row, next_row)] = next_row
+                    self._renew(lease)
+                    yield result
+        finally:
+            # İstemci bağlantıyı keserse bu işin kuyruktaki satırlarını iptal et
+            for future in futures:
+                future.cancel()
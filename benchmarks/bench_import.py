@@ -0,0 +1,79 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import app
+print((time.perf_counter() - started) * 1000)
+"""
+
+# Açılışta yüklenmemesi gereken ağır modüller (fontlar arka plan ısınmasında yüklenir)
+DEFERRED_MODULES = ("openai", "PIL.ImageDraw", "httpx", "requests")
+
+CHECK_SNIPPET = """
+import sys
+import app
+loaded = [m for m in {modules!r} if m in sys.modules and getattr(sys.modules[m], '__spec__', None) and type(sys.modules[m]).__name__ == 'module']
+print(','.join(loaded))
+"""
+
+
+def bench_env():
+    env = dict(os.environ)
+    env.setdefault("FLASK_SECRET_KEY", "benchmark")
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env["OPENAI_VALIDATE_ON_STARTUP"] = "False"
+    env["LLM_CACHE_DB"] = ""
+    return env
+
+
+def measure(runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=ROOT, env=bench_env(), capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def eagerly_loaded():
+    output = subprocess.run(
+        [sys.executable, "-c", CHECK_SNIPPET.format(modules=DEFERRED_MODULES)],
+        cwd=ROOT, env=bench_env(), capture_output=True, text=True, check=True
+    ).stdout
+    last = output.strip().splitlines()[-1] if output.strip() else ""
+    return [m for m in last.split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py import süresi ölçümü")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="medyan bu değeri aşarsa hata ver")
+    args = parser.parse_args()
+
+    timings = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"import app: medyan {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms ({args.runs} çalıştırma)")
+
+    failed = False
+    loaded = eagerly_loaded()
+    if loaded:
+        print(f"HATA: açılışta yüklenmemesi gereken modüller yüklendi: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"HATA: medyan {median:.1f} ms > {args.max_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
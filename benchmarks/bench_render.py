@@ -0,0 +1,112 @@
+import argparse
+import io
+import json
+import logging
+import sys
+
+from harness import add_arguments, prepare_environment, run_suite
+
+prepare_environment()
+
+import app  # noqa: E402
+import stubs  # noqa: E402
+from flask.logging import default_handler  # noqa: E402
+from font_registry import fit_font, get_font, load_font  # noqa: E402
+from PIL import Image, ImageFilter  # noqa: E402
+from text_effects import draw_text_with_effects  # noqa: E402
+from thumbnail_compose import build_overlay_gradient, build_vertical_gradient, render_outputs  # noqa: E402
+from thumbnail_output import encode_outputs  # noqa: E402
+
+SIZE = (1280, 720)
+MAIN_TEXT = stubs.DESIGN["main_text"]
+
+
+def build_benchmarks():
+    background_bytes = stubs.install(app)
+    app.app.logger.removeHandler(default_handler)
+    app.app.logger.setLevel(logging.WARNING)
+    # Her ölçüm gerçek render yapsın diye thumbnail önbelleği devre dışı
+    app.thumbnail_store.get = lambda key: None
+    app.thumbnail_store.put = lambda key, data: None
+
+    gradient = build_vertical_gradient(SIZE, (255, 107, 107), (78, 205, 196))
+    overlay = build_overlay_gradient(SIZE, (0, 0, 0), (26, 26, 26), 0.6)
+    composed = Image.alpha_composite(gradient.convert('RGBA'), overlay).convert('RGB')
+    main_font = fit_font(MAIN_TEXT, SIZE[0] - 120, max_size=110)
+    sub_font = load_font(55)
+    frame = app.prepare_background(Image.open(io.BytesIO(background_bytes)), SIZE).tobytes()
+    seo_raw = json.dumps(stubs.SEO, ensure_ascii=False)
+    long_input = ("<b>Merhaba</b> dünya!   İstanbul vlog'u " * 40)
+
+    def fit_font_cold():
+        get_font.cache_clear()
+        fit_font(MAIN_TEXT, SIZE[0] - 120, max_size=110)
+
+    def stroke():
+        draw_text_with_effects(composed.copy(), (100, 300), MAIN_TEXT, main_font, (255, 255, 255), (0, 0, 0),
+                               stroke_width=6)
+
+    def effects():
+        draw_text_with_effects(composed.copy(), (100, 300), MAIN_TEXT, main_font, (255, 255, 255), (0, 0, 0),
+                               stroke_width=6, glow_color=(255, 217, 61), glow_radius=12,
+                               shadow_color=(0, 0, 0), shadow_intensity=0.8)
+
+    def subtitle():
+        draw_text_with_effects(composed.copy(), (400, 450), stubs.DESIGN["sub_text"], sub_font,
+                               (255, 255, 255), (0, 0, 0), stroke_width=3,
+                               shadow_color=(0, 0, 0), shadow_intensity=0.8)
+
+    def jpeg_encode():
+        encode_outputs(composed, formats=('jpeg',))
+
+    def webp_encode():
+        encode_outputs(composed, formats=('webp',))
+
+    def prepare_photo():
+        app.prepare_background(Image.open(io.BytesIO(background_bytes)), SIZE)
+
+    def decode_background():
+        Image.open(io.BytesIO(background_bytes)).load()
+
+    def render_gradient():
+        app.create_thumbnail_image(stubs.DESIGN, "Vlog", background_ref={'gradient': ['#FF6B6B', '#4ECDC4']})
+
+    def render_photo():
+        app.create_thumbnail_image(stubs.DESIGN, "Vlog", background_ref={'url': 'https://images.unsplash.com/b.jpg'})
+
+    def render_from_frame():
+        # Varyant modunda süreç başına yapılan iş: hazır kareden kompozisyon ve kodlama
+        render_outputs(stubs.DESIGN, frame, {'url': 'https://images.unsplash.com/b.jpg'}, SIZE)
+
+    return [
+        ("stage.gradient", lambda: build_vertical_gradient(SIZE, (255, 107, 107), (78, 205, 196))),
+        ("stage.overlay", lambda: build_overlay_gradient(SIZE, (0, 0, 0), (26, 26, 26), 0.6)),
+        ("stage.composite", lambda: Image.alpha_composite(gradient.convert('RGBA'), overlay).convert('RGB')),
+        ("stage.decode_background", decode_background),
+        ("stage.prepare_background", prepare_photo),
+        ("stage.fit_font_cached", lambda: fit_font(MAIN_TEXT, SIZE[0] - 120, max_size=110)),
+        ("stage.fit_font_cold", fit_font_cold),
+        ("stage.stroke", stroke),
+        ("stage.glow_shadow", effects),
+        ("stage.subtitle", subtitle),
+        ("stage.sharpen", lambda: composed.filter(ImageFilter.SHARPEN)),
+        ("stage.encode_jpeg_all_sizes", jpeg_encode),
+        ("stage.encode_webp_all_sizes", webp_encode),
+        ("text.sanitize_input", lambda: app.sanitize_input(long_input, max_length=1000)),
+        ("text.finalize_seo_output", lambda: app.finalize_seo_output(seo_raw)),
+        ("text.background_query", lambda: app.build_background_query("Vlog", MAIN_TEXT, stubs.DESCRIPTION)),
+        ("render.gradient", render_gradient),
+        ("render.photo", render_photo),
+        ("render.variant_from_frame", render_from_frame),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thumbnail render aşamaları mikro ölçümleri")
+    add_arguments(parser)
+    args = parser.parse_args()
+    return run_suite("render", build_benchmarks(), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
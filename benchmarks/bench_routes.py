@@ -0,0 +1,112 @@
+import argparse
+import io
+import itertools
+import logging
+import os
+import sys
+import time
+
+from harness import add_arguments, prepare_environment, run_suite
+
+prepare_environment()
+
+import app  # noqa: E402
+import stubs  # noqa: E402
+from flask.logging import default_handler  # noqa: E402
+
+SUMMARY = "İstanbul'da bir gün geçirdik, Boğaz'da yürüdük ve sokak lezzetlerini denedik."
+
+
+def wait_for_job(client, status_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(status_url).get_json()
+        if status["status"] in ("done", "error"):
+            return status
+        time.sleep(0.002)
+    raise RuntimeError("Render işi zaman aşımına uğradı")
+
+
+def check(response, *statuses):
+    if response.status_code not in statuses:
+        raise RuntimeError(f"{response.request.path}: beklenmeyen durum {response.status_code}")
+    return response
+
+
+def build_benchmarks():
+    stubs.install(app)
+    app.app.logger.removeHandler(default_handler)
+    app.app.logger.setLevel(logging.WARNING)
+
+    client = app.app.test_client()
+    check(client.post('/', data={'category': 'Vlog'}), 302)
+    check(client.post('/detay', data={'user_input': SUMMARY}), 302)
+    check(client.get('/optimize'), 200)
+    job = check(client.post('/generate-thumbnail', json={}), 202).get_json()
+    image_url = wait_for_job(client, job['status_url'])['image_url']
+    counter = itertools.count()
+
+    def generate_thumbnail(fresh):
+        def run():
+            response = check(client.post('/generate-thumbnail', json={'fresh': fresh}), 202)
+            status = wait_for_job(client, response.get_json()['status_url'])
+            if status['status'] != 'done':
+                raise RuntimeError(status.get('error'))
+        return run
+
+    def render_uncached():
+        # Tasarım başlığı taşıdığı için her turda yeni başlık = önbelleğe düşmeyen gerçek render
+        response = check(client.post('/generate-thumbnail', json={'custom_title': f"Tur {next(counter)}"}), 202)
+        status = wait_for_job(client, response.get_json()['status_url'])
+        if status['status'] != 'done':
+            raise RuntimeError(status.get('error'))
+
+    def optimize_stream():
+        response = check(client.get('/optimize/stream'), 200)
+        b"".join(response.response)
+
+    def batch():
+        # Aynı satırlar deftere işlendiği için her turda yeni bir toplu iş oluşturulur
+        n = next(counter)
+        body = "\n".join(
+            f'{{"category": "Vlog", "summary": "{SUMMARY} ({n}-{i})"}}' for i in range(3)
+        ).encode('utf-8')
+        response = check(client.post('/batch', data={
+            'file': (io.BytesIO(body), 'batch.jsonl'),
+            'thumbnails': 'false',
+        }, content_type='multipart/form-data', headers={'Authorization': f"Bearer {os.environ['BATCH_TOKEN']}"}), 200)
+        b"".join(response.response)
+        response.close()
+
+    def download():
+        check(client.get('/download-thumbnail'), 200)
+
+    return [
+        ("GET /", lambda: check(client.get('/'), 200)),
+        ("POST /", lambda: check(client.post('/', data={'category': 'Vlog'}), 302)),
+        ("GET /detay", lambda: check(client.get('/detay'), 200)),
+        ("POST /detay", lambda: check(client.post('/detay', data={'user_input': SUMMARY}), 302)),
+        ("GET /optimize", lambda: check(client.get('/optimize'), 200)),
+        ("GET /optimize/stream", optimize_stream),
+        ("POST /generate-thumbnail (önbellek)", generate_thumbnail(False)),
+        ("POST /generate-thumbnail (taze)", generate_thumbnail(True)),
+        ("POST /generate-thumbnail (yeni render)", render_uncached),
+        ("GET /thumbnails/<key> jpeg", lambda: check(client.get(image_url, headers={'Accept': '*/*'}), 200)),
+        ("GET /thumbnails/<key> webp", lambda: check(client.get(image_url, headers={'Accept': 'image/webp'}), 200)),
+        ("GET /thumbnails/<key> 304", lambda: check(
+            client.get(image_url, headers={'Accept': '*/*', 'If-None-Match': '*'}), 304)),
+        ("GET /download-thumbnail", download),
+        ("POST /batch (3 satır)", batch),
+        ("GET /healthz", lambda: check(client.get('/healthz'), 200)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask rotalarının uçtan uca ölçümü (OpenAI/Unsplash taklit)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    return run_suite("routes", build_benchmarks(), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def prepare_environment():
+    # app import edilmeden önce çağrılmalı: önbellekler kapalı, durum geçici dizinde, dış servis yok
+    state_dir = tempfile.mkdtemp(prefix="yt-bench-")
+    os.environ.setdefault("FLASK_SECRET_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ["OPENAI_VALIDATE_ON_STARTUP"] = "False"
+    os.environ["LLM_CACHE_ENABLED"] = "False"
+    os.environ["BACKGROUND_POOL_SIZE"] = "0"
+    os.environ["SESSION_DB"] = os.path.join(state_dir, "sessions.sqlite3")
+    os.environ["BATCH_DIR"] = os.path.join(state_dir, "batches")
+    os.environ.setdefault("BATCH_TOKEN", "benchmark")
+    os.environ.pop("SHARED_STATE_DIR", None)
+    os.environ.pop("THUMBNAIL_CACHE_DIR", None)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return state_dir
+
+
+def measure(fn, runs=20, warmup=2):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "runs": runs,
+    }
+
+
+def baseline_path(suite):
+    return os.path.join(BASELINE_DIR, f"{suite}.json")
+
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def save_baseline(suite, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(suite), "w", encoding="utf-8") as f:
+        json.dump({"machine": machine(), "results": results}, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def load_baseline(suite):
+    try:
+        with open(baseline_path(suite), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    # Küçük ölçümlerde gürültüyü elemek için hem oransal hem mutlak fark aranır
+    regressions = []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        delta = result["median_ms"] - previous["median_ms"]
+        if delta > min_delta_ms and result["median_ms"] > previous["median_ms"] * (1 + threshold):
+            regressions.append((name, previous["median_ms"], result["median_ms"]))
+    return regressions
+
+
+def add_arguments(parser):
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--only", default=None, help="yalnızca adı bu metni içeren ölçümler")
+    parser.add_argument("--save-baseline", action="store_true", help="sonuçları referans olarak kaydet")
+    parser.add_argument("--compare", action="store_true", help="kayıtlı referansla karşılaştır")
+    parser.add_argument("--threshold", type=float, default=0.25, help="izin verilen oransal yavaşlama")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="bunun altındaki farklar yok sayılır")
+
+
+def run_suite(suite, benchmarks, args):
+    results = {}
+    for name, fn in benchmarks:
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(fn, runs=args.runs)
+        r = results[name]
+        print(f"{name:<40} medyan {r['median_ms']:>9.3f} ms  min {r['min_ms']:>9.3f}  max {r['max_ms']:>9.3f}")
+
+    if args.save_baseline:
+        save_baseline(suite, results)
+        print(f"Referans kaydedildi: {baseline_path(suite)}")
+
+    if not args.compare:
+        return 0
+    baseline = load_baseline(suite)
+    if baseline is None:
+        print(f"HATA: referans yok, önce --save-baseline ile oluşturun ({baseline_path(suite)})")
+        return 1
+    if baseline.get("machine") != machine():
+        print("UYARI: referans farklı bir makinede/Python sürümünde kaydedilmiş")
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for name, before, after in regressions:
+        print(f"HATA: {name} yavaşladı: {before:.3f} ms -> {after:.3f} ms")
+    if not regressions:
+        print(f"Gerileme yok (eşik %{args.threshold * 100:.0f})")
+    return 1 if regressions else 0
@@ -0,0 +1,210 @@
+import argparse
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+
+import requests
+
+CSRF_FIELD = re.compile(r'name="csrf_token" value="([^"]+)"')
+# "render" tek bir istek değil: işin kuyruğa girişinden "done" yanıtına kadar geçen süre
+STEPS = ("index", "category", "detay", "optimize", "generate", "poll", "render", "download")
+
+
+class StepFailed(Exception):
+    def __init__(self, step, status):
+        super().__init__(f"{step}: {status}")
+        self.step = step
+        self.status = status
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {step: [] for step in STEPS}
+        self.statuses = {}
+        self.sessions = 0
+        self.failures = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def step(self, step, seconds, status):
+        with self._lock:
+            self.requests += 1
+            self.latencies[step].append(seconds * 1000)
+            key = f"{step} {status}"
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def duration(self, step, seconds):
+        with self._lock:
+            self.latencies[step].append(seconds * 1000)
+
+    def session(self, failed_step=None):
+        with self._lock:
+            if failed_step is None:
+                self.sessions += 1
+            else:
+                self.failures[failed_step] = self.failures.get(failed_step, 0) + 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, category, summary, poll_interval, render_timeout):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.category = category
+        self.summary = summary
+        self.poll_interval = poll_interval
+        self.render_timeout = render_timeout
+
+    def _request(self, session, step, method, path, expect, **kwargs):
+        started = time.perf_counter()
+        response = session.request(method, self.base_url + path, allow_redirects=False, timeout=120, **kwargs)
+        self.recorder.step(step, time.perf_counter() - started, response.status_code)
+        # Uygulama Secure çerez verir; yerel http hedefinde de oturum taşınabilsin diye bayrak kaldırılır
+        for cookie in session.cookies:
+            cookie.secure = False
+        if response.status_code not in expect:
+            raise StepFailed(step, response.status_code)
+        return response
+
+    @staticmethod
+    def _csrf(response):
+        match = CSRF_FIELD.search(response.text)
+        return match.group(1) if match else ""
+
+    def run_once(self, number):
+        session = requests.Session()
+        summary = self.summary or f"Yük testi oturumu {number} {uuid.uuid4().hex[:8]}: şehirde bir gün geçirdik"
+        try:
+            token = self._csrf(self._request(session, "index", "GET", "/", (200,)))
+            self._request(session, "category", "POST", "/", (302,),
+                          data={"category": self.category, "csrf_token": token})
+            token = self._csrf(self._request(session, "detay", "GET", "/detay", (200,)))
+            location = self._request(session, "detay", "POST", "/detay", (302,),
+                                     data={"user_input": summary, "csrf_token": token}).headers["Location"]
+            if "error_message" in location:
+                raise StepFailed("detay", "redirect-error")
+            self._request(session, "optimize", "GET", "/optimize", (200,))
+
+            job = self._request(session, "generate", "POST", "/generate-thumbnail", (202,),
+                                json={}, headers={"X-CSRFToken": token}).json()
+            started = time.perf_counter()
+            while True:
+                status = self._request(session, "poll", "GET", job["status_url"], (200,)).json()
+                if status["status"] == "done":
+                    break
+                if status["status"] == "error":
+                    raise StepFailed("render", status.get("error"))
+                if time.perf_counter() - started > self.render_timeout:
+                    raise StepFailed("render", "timeout")
+                time.sleep(self.poll_interval)
+            self.recorder.duration("render", time.perf_counter() - started)
+
+            self._request(session, "download", "GET", "/download-thumbnail", (200,))
+            self.recorder.session()
+        except StepFailed as e:
+            self.recorder.session(e.step)
+            return False
+        except requests.RequestException as e:
+            self.recorder.session(type(e).__name__)
+            return False
+        finally:
+            session.close()
+        return True
+
+
+def run(args):
+    recorder = Recorder()
+    counter = itertools.count()
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+
+    def worker(index):
+        # Kullanıcılar rampa süresi boyunca eşit aralıklarla devreye girer
+        time.sleep(args.ramp * index / max(args.users, 1))
+        user = VirtualUser(args.base_url, recorder, args.category, args.summary,
+                           args.poll_interval, args.render_timeout)
+        while time.monotonic() < deadline:
+            number = next(counter)
+            if args.sessions and number >= args.sessions:
+                return
+            # Başarısız oturumdan sonra kısa bekleme; 429 alan kullanıcı sunucuyu boş döngüyle doldurmasın
+            if not user.run_once(number):
+                time.sleep(max(args.poll_interval, 0.5))
+            elif args.think_time:
+                time.sleep(args.think_time)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - started
+
+
+def report(recorder, elapsed):
+    summary = {
+        "elapsed_s": round(elapsed, 2),
+        "sessions": recorder.sessions,
+        "sessions_per_s": round(recorder.sessions / elapsed, 3) if elapsed else 0,
+        "requests_per_s": round(recorder.requests / elapsed, 2) if elapsed else 0,
+        "failures": recorder.failures,
+        "statuses": recorder.statuses,
+        "steps": {},
+    }
+    for step, values in recorder.latencies.items():
+        if not values:
+            continue
+        summary["steps"][step] = {
+            "count": len(values),
+            **{name: round(percentile(values, q), 1) for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))},
+            "max": round(max(values), 1),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="index → detay → optimize → thumbnail → indirme akışı için yük üreteci")
+    parser.add_argument("base_url", nargs="?", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=8, help="eşzamanlı sanal kullanıcı")
+    parser.add_argument("--duration", type=float, default=60, help="saniye")
+    parser.add_argument("--sessions", type=int, default=0, help="toplam oturum sınırı (0 = süre boyunca)")
+    parser.add_argument("--ramp", type=float, default=5, help="tüm kullanıcıların devreye girme süresi")
+    parser.add_argument("--think-time", type=float, default=0)
+    parser.add_argument("--category", default="Vlog")
+    parser.add_argument("--summary", help="sabit özet; verilirse LLM önbelleği isabetleri ölçülür")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--render-timeout", type=float, default=90)
+    parser.add_argument("--json", action="store_true", help="raporu JSON olarak yaz")
+    args = parser.parse_args()
+
+    recorder, elapsed = run(args)
+    summary = report(recorder, elapsed)
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return 0 if not summary["failures"] else 1
+
+    print(f"Süre {summary['elapsed_s']} sn, {summary['sessions']} oturum "
+          f"({summary['sessions_per_s']} oturum/sn, {summary['requests_per_s']} istek/sn)")
+    for step, stats in summary["steps"].items():
+        print(f"{step:<10} n={stats['count']:<6} p50 {stats['p50']:>9.1f} ms  p90 {stats['p90']:>9.1f}  "
+              f"p99 {stats['p99']:>9.1f}  max {stats['max']:>9.1f}")
+    limited = {key: count for key, count in summary["statuses"].items() if key.endswith(" 429")}
+    if limited:
+        print(f"UYARI: hız sınırına takılan istekler: {limited}")
+    if summary["failures"]:
+        print(f"Başarısız oturumlar (adım: sayı): {summary['failures']}")
+    return 0 if not summary["failures"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
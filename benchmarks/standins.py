@@ -0,0 +1,226 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import stubs
+from harness import ROOT
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from openai_governor import CHARS_PER_TOKEN  # noqa: E402
+
+# Uygulamayı yerel taklit sunuculara yönlendirmek için:
+#   OPENAI_BASE_URL=http://127.0.0.1:8901/v1 UNSPLASH_API_URL=http://127.0.0.1:8902 UNSPLASH_ACCESS_KEY=yerel
+
+
+class Behaviour:
+    # Gecikme = latency ± jitter (+ üretilen token / tokens_per_second); hatalar 429 ve 500 arasında dağıtılır
+    def __init__(self, latency=0.0, jitter=0.0, tokens_per_second=0.0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+
+    def first_byte_delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def generation_delay(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def failure(self):
+        if self.error_rate and random.random() < self.error_rate:
+            return random.choice((429, 500))
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    behaviour = Behaviour()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail(self, status):
+        message = "Rate limit reached" if status == 429 else "Internal server error"
+        error = {"error": {"message": message, "type": "standin_error", "code": None}}
+        self._send(status, error, headers={"Retry-After": "1"} if status == 429 else None)
+
+
+class OpenAIHandler(_Handler):
+    def do_GET(self):
+        if urlsplit(self.path).path.rstrip("/") == "/v1/models":
+            self._send(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "standin"}]})
+            return
+        self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if urlsplit(self.path).path.rstrip("/") != "/v1/chat/completions":
+            self._send(404, {"error": {"message": "not found"}})
+            return
+
+        time.sleep(self.behaviour.first_byte_delay())
+        status = self.behaviour.failure()
+        if status:
+            self._fail(status)
+            return
+
+        messages = request.get("messages", [])
+        content = stubs.completion_content(messages, request.get("response_format"), vary=True)
+        finish_reason = "stop"
+        max_tokens = request.get("max_tokens")
+        if max_tokens and len(content) > max_tokens * CHARS_PER_TOKEN:
+            # Gerçek API gibi sınırda keser; JSON yanıtlar bu durumda bozuk gelir
+            content = content[:max_tokens * CHARS_PER_TOKEN]
+            finish_reason = "length"
+        usage = {
+            "prompt_tokens": sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN,
+            "completion_tokens": len(content) // CHARS_PER_TOKEN,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": request.get("model")}
+
+        if not request.get("stream"):
+            time.sleep(self.behaviour.generation_delay(usage["completion_tokens"]))
+            self._send(200, dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }]))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        size = 24
+        delay = self.behaviour.generation_delay(size / CHARS_PER_TOKEN)
+        for start in range(0, len(content), size):
+            time.sleep(delay)
+            self._event(dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None,
+            }]))
+        self._event(dict(base, object="chat.completion.chunk", choices=[{
+            "index": 0, "delta": {}, "finish_reason": finish_reason,
+        }]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._event(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class UnsplashHandler(_Handler):
+    photos = 5
+    _images = {}
+    _lock = threading.Lock()
+
+    def _image(self, size):
+        # Boyut başına bir kez üretilir; imgix'in w/h parametreleriyle kırpılmış görseli taklit eder
+        with self._lock:
+            image = self._images.get(size)
+            if image is None:
+                image = self._images[size] = stubs.background_jpeg(size)
+        return image
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path.rstrip("/") == "/photos/random":
+            time.sleep(self.behaviour.first_byte_delay())
+            status = self.behaviour.failure()
+            if status:
+                self._fail(status)
+                return
+            if not query.get("client_id") and not self.headers.get("Authorization"):
+                self._send(401, {"errors": ["OAuth error: The access token is invalid"]})
+                return
+            photo_id = f"standin{random.randrange(self.photos)}"
+            host = self.headers.get("Host")
+            raw = f"http://{host}/images/{photo_id}?ixid=standin"
+            self._send(200, {
+                "id": photo_id,
+                "width": 1920,
+                "height": 1280,
+                "urls": {"raw": raw, "regular": raw + "&w=1080", "small": raw + "&w=400"},
+                "user": {"name": "Standin"},
+            })
+            return
+        if parts.path.startswith("/images/"):
+            time.sleep(self.behaviour.first_byte_delay())
+            width = int(query.get("w", ["1920"])[0])
+            height = int(query.get("h", [str(width * 2 // 3)])[0])
+            self._send(200, self._image((width, height)), content_type="image/jpeg",
+                       headers={"Cache-Control": "public, max-age=31536000"})
+            return
+        self._send(404, {"errors": ["not found"]})
+
+
+def serve(handler, behaviour, host, port, **attributes):
+    handler_class = type(handler.__name__, (handler,), dict(attributes, behaviour=behaviour))
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"standin-{port}", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yük testi için yerel OpenAI ve Unsplash taklit sunucuları")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=8901)
+    parser.add_argument("--unsplash-port", type=int, default=8902)
+    parser.add_argument("--openai-latency", type=float, default=0.4, help="ilk bayta kadar saniye")
+    parser.add_argument("--openai-jitter", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="üretim hızı; 0 ise anlık")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--unsplash-latency", type=float, default=0.15)
+    parser.add_argument("--unsplash-jitter", type=float, default=0.05)
+    parser.add_argument("--unsplash-error-rate", type=float, default=0.0)
+    parser.add_argument("--photos", type=int, default=5, help="farklı arka plan sayısı")
+    parser.add_argument("--payloads", help="DESCRIPTION/SEO/DESIGN alanlarını ezen JSON dosyası")
+    args = parser.parse_args()
+
+    if args.payloads:
+        with open(args.payloads, encoding="utf-8") as f:
+            for name, value in json.load(f).items():
+                setattr(stubs, name.upper(), value)
+
+    openai_server = serve(OpenAIHandler, Behaviour(
+        args.openai_latency, args.openai_jitter, args.tokens_per_second, args.openai_error_rate
+    ), args.host, args.openai_port)
+    unsplash_server = serve(UnsplashHandler, Behaviour(
+        args.unsplash_latency, args.unsplash_jitter, 0, args.unsplash_error_rate
+    ), args.host, args.unsplash_port, photos=args.photos)
+    print(f"OPENAI_BASE_URL=http://{args.host}:{openai_server.server_port}/v1")
+    print(f"UNSPLASH_API_URL=http://{args.host}:{unsplash_server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import hashlib
+import io
+import json
+import re
+from types import SimpleNamespace
+
+
+DESCRIPTION = (
+    "Bu videoda İstanbul'un en güzel sokaklarını geziyoruz. " * 12
+).strip()
+
+SEO = {
+    "title": [
+        "İstanbul Sokaklarında Bir Gün 🌆 Gizli Kalmış Yerler",
+        "İstanbul'u Hiç Böyle Görmediniz! 😍 Şehir Turu",
+        "Boğaz'dan Tarihi Yarımada'ya İstanbul Vlog ✨",
+    ],
+    "description": "İstanbul vlog açıklaması #istanbul #vlog " * 40,
+    "tags": ["istanbul", "vlog", "gezi", "şehir turu", "boğaz", "türkiye", "seyahat", "sokak", "tarih", "yemek"],
+    "seo_score": 84,
+}
+
+DESIGN = {
+    "main_text": "İSTANBUL SOKAKLARI",
+    "sub_text": "Gizli kalmış yerler",
+    "text_position": "center",
+    "colors": {
+        "overlay_start": "#000000",
+        "overlay_end": "#1a1a1a",
+        "overlay_opacity": 0.6,
+        "text_main": "#FFFFFF",
+        "text_stroke": "#000000",
+        "accent": "#FFD93D",
+        "shadow": "#000000",
+    },
+    "effects": {"glow": True, "shadow_intensity": 0.8, "text_outline_width": 6},
+}
+
+USAGE = SimpleNamespace(prompt_tokens=400, completion_tokens=600, total_tokens=1000)
+
+
+def _message(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=USAGE,
+    )
+
+
+def _chunks(content, size=24):
+    for start in range(0, len(content), size):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[start:start + size]))])
+
+
+def completion_content(messages, response_format=None, vary=False):
+    # vary: kullanıcı mesajının özeti çıktıya eklenir; her oturum farklı önbellek anahtarlarına düşer
+    system = messages[0]["content"]
+    user = messages[-1]["content"]
+    tag = f" #{hashlib.sha1(user.encode('utf-8')).hexdigest()[:6]}" if vary else ""
+    if "Tek JSON yanıtında" in system:
+        seo = dict(SEO, title=[title + tag for title in SEO["title"]])
+        design = dict(DESIGN, main_text=seo["title"][0].upper())
+        return json.dumps({"description": DESCRIPTION + tag, "seo": seo, "design": design}, ensure_ascii=False)
+    if "thumbnail" in system:
+        title = re.search(r'başlığı kullan: "(.*)"', user)
+        design = dict(DESIGN, main_text=title.group(1).upper()) if title else DESIGN
+        return json.dumps(design, ensure_ascii=False)
+    if response_format:
+        return json.dumps(dict(SEO, title=[title + tag for title in SEO["title"]]), ensure_ascii=False)
+    return DESCRIPTION + tag
+
+
+class _Completions:
+    def create(self, messages, stream=False, **kwargs):
+        content = completion_content(messages, kwargs.get("response_format"))
+        return _chunks(content) if stream else _message(content)
+
+
+class StubOpenAI:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_Completions())
+        self.models = SimpleNamespace(list=lambda: [])
+
+    def with_options(self, **kwargs):
+        return self
+
+
+def background_jpeg(size=(1920, 1280)):
+    from PIL import Image, ImageFilter
+
+    # Düz renk yerine dokulu bir görsel; JPEG çözme/ölçekleme maliyeti gerçek fotoğrafa yakın olsun
+    img = Image.effect_noise(size, 64).filter(ImageFilter.GaussianBlur(2))
+    img = Image.merge("RGB", (img, img.rotate(180), img.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+class _Response:
+    def __init__(self, status_code, payload=None, content=b""):
+        self.status_code = status_code
+        self._payload = payload
+        self.content = content
+
+    def json(self):
+        return self._payload
+
+
+def install(app_module):
+    # OpenAI istemcisi ve Unsplash HTTP çağrıları ağ yerine sabit yanıtlarla değiştirilir
+    image = background_jpeg()
+
+    def fake_get(url, **kwargs):
+        if url.endswith("/photos/random"):
+            return _Response(200, {"urls": {
+                "raw": "https://images.unsplash.com/benchmark.jpg?ixid=benchmark",
+                "regular": "https://images.unsplash.com/benchmark.jpg?w=1080",
+            }})
+        return _Response(200, content=image)
+
+    app_module.client = StubOpenAI()
+    app_module.UNSPLASH_ACCESS_KEY = "benchmark"
+    app_module.http_client.get = fake_get
+    app_module.app.config["RATELIMIT_ENABLED"] = False
+    app_module.limiter.enabled = False
+    app_module.app.config["WTF_CSRF_ENABLED"] = False
+    app_module.app.config["SESSION_COOKIE_SECURE"] = False
+    return image
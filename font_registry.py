@@ -0,0 +1,93 @@
+from functools import lru_cache
+import os
+import threading
+
+from lazy_imports import lazy_import
+
+ImageFont = lazy_import('PIL.ImageFont')
+
+
+FONT_CANDIDATES = [
+    "C:\\Windows\\Fonts\\impact.ttf",
+    "C:\\Windows\\Fonts\\IMPACTED.TTF",
+    "C:\\Windows\\Fonts\\ariblk.ttf",
+    "C:\\Windows\\Fonts\\ARLRDBD.TTF",
+    "C:\\Windows\\Fonts\\calibrib.ttf",
+    "C:\\Windows\\Fonts\\BAUHS93.TTF",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/System/Library/Fonts/Impact.ttf",
+]
+
+FONT_CACHE_SIZE = int(os.getenv("FONT_CACHE_SIZE", 64))
+MIN_FONT_SIZE = 24
+# Taşan başlıklar eski davranışta olduğu gibi genişliğin %85'ine sığdırılır
+OVERFLOW_MARGIN = 0.85
+
+_available_fonts = None
+_lock = threading.Lock()
+
+
+def _candidate_paths():
+    extra = os.getenv("THUMBNAIL_FONT_PATHS", "")
+    paths = [p for p in extra.split(os.pathsep) if p]
+    return paths + FONT_CANDIDATES
+
+
+def available_fonts():
+    global _available_fonts
+    if _available_fonts is None:
+        with _lock:
+            if _available_fonts is None:
+                found = []
+                for path in _candidate_paths():
+                    if not os.path.isfile(path):
+                        continue
+                    try:
+                        ImageFont.truetype(path, MIN_FONT_SIZE)
+                    except OSError:
+                        continue
+                    found.append(path)
+                _available_fonts = found
+    return _available_fonts
+
+
+def primary_font_path():
+    fonts = available_fonts()
+    return fonts[0] if fonts else None
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(path, size):
+    if path is None:
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(path, size)
+
+
+def load_font(size):
+    return get_font(primary_font_path(), size)
+
+
+def text_width(font, text):
+    bbox = font.getbbox(text)
+    return bbox[2] - bbox[0]
+
+
+def fit_font(text, max_width, max_size=110, min_size=MIN_FONT_SIZE):
+    path = primary_font_path()
+    font = get_font(path, max_size)
+    if text_width(font, text) <= max_width:
+        return font
+
+    # En büyük sığan boyutu önbellekteki fontlar üzerinde ikili arama ile bul
+    target = max_width * OVERFLOW_MARGIN
+    low, high = min_size, max_size - 1
+    best = get_font(path, min_size)
+    while low <= high:
+        size = (low + high) // 2
+        font = get_font(path, size)
+        if text_width(font, text) <= target:
+            best = font
+            low = size + 1
+        else:
+            high = size - 1
+    return best
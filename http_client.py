@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import os
+import threading
+import time
+
+
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 20))
+PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", 8))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", 60))
+# Yük testlerinde yerel taklit sunuculara yönlendirilebilir (benchmarks/standins.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1/")
+UNSPLASH_API_URL = os.getenv("UNSPLASH_API_URL", "https://api.unsplash.com").rstrip('/')
+
+_session = None
+_openai_http_client = None
+_host_limits = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _host_semaphore(url):
+    host = urlsplit(url).netloc
+    with _lock:
+        semaphore = _host_limits.get(host)
+        if semaphore is None:
+            semaphore = _host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+    return semaphore
+
+
+@contextmanager
+def host_slot(url):
+    # Aynı hosta giden eşzamanlı istek sayısını sınırla
+    semaphore = _host_semaphore(url)
+    with semaphore:
+        yield
+
+
+def timeout_until(deadline):
+    # Okuma zaman aşımı aşama süresinden kalan zamanı geçmez; süre dolduysa istek hiç başlamaz
+    if deadline is None:
+        return (CONNECT_TIMEOUT, READ_TIMEOUT)
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Aşama süresi doldu")
+    return (min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining))
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+    with host_slot(url):
+        return get_session().get(url, **kwargs)
+
+
+def openai_http_client():
+    global _openai_http_client
+    if _openai_http_client is None:
+        with _lock:
+            if _openai_http_client is None:
+                import httpx
+
+                _openai_http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=PER_HOST_LIMIT,
+                        max_keepalive_connections=PER_HOST_LIMIT,
+                    ),
+                    timeout=httpx.Timeout(OPENAI_READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                )
+    return _openai_http_client
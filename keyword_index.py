@@ -0,0 +1,74 @@
+import json
+import os
+import re
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'background_queries.json')
+LOCATION_GROUP = "Lokasyon"
+
+# Türkçe büyük/küçük harf: I -> ı, İ -> i; ardından aksanlar ASCII'ye indirgenir ("KOŞU" == "kosu")
+_TURKISH_UPPER = str.maketrans({'I': 'ı', 'İ': 'i', '\u0307': None})
+_ASCII_FOLD = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+
+
+def fold(text):
+    return " ".join(text.translate(_TURKISH_UPPER).lower().translate(_ASCII_FOLD).split())
+
+
+class _Group:
+    def __init__(self, entries):
+        self.lookup = {}
+        alternatives = []
+        for priority, entry in enumerate(entries):
+            for key in entry['keys']:
+                folded = fold(key)
+                if not folded or folded in self.lookup:
+                    continue
+                self.lookup[folded] = (priority, key, entry['query'])
+                # Ön ek girdileri Türkçe ekleri kabul eder (futbolu, makarnası); diğerleri tam kelime
+                suffix = '' if entry.get('prefix') else r'(?!\w)'
+                alternatives.append((folded, re.escape(folded) + suffix))
+        alternatives.sort(key=lambda item: len(item[0]), reverse=True)
+        pattern = '|'.join(alt for _, alt in alternatives) or r'(?!x)x'
+        self.regex = re.compile(r'(?<!\w)(?:' + pattern + ')')
+
+    def match(self, folded_text):
+        best = None
+        for m in self.regex.finditer(folded_text):
+            found = self.lookup.get(m.group(0))
+            if found and (best is None or found[0] < best[0]):
+                best = found
+                if best[0] == 0:
+                    break
+        return best
+
+
+class KeywordIndex:
+    def __init__(self, data):
+        self.default = data.get('default', "creative,vibrant,colorful")
+        self.categories = data.get('categories', {})
+        self.groups = {LOCATION_GROUP: _Group(data.get('locations', []))}
+        for category, entries in data.get('topics', {}).items():
+            self.groups[category] = _Group(entries)
+
+    @classmethod
+    def from_file(cls, path=None):
+        with open(path or DEFAULT_PATH, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, text, category):
+        folded_text = fold(text)
+        for group in (LOCATION_GROUP, category):
+            if group not in self.groups:
+                continue
+            found = self.groups[group].match(folded_text)
+            if found:
+                _, key, query = found
+                return group, key, query
+        return None
+
+    def category_query(self, category):
+        return self.categories.get(category, self.default)
+
+    def default_queries(self):
+        return list(self.categories.values())
@@ -0,0 +1,18 @@
+import importlib
+import importlib.util
+import types
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        # İçe aktarma kilidi eşzamanlı ilk erişimlerde yarım yüklenmiş modülün görülmesini engeller
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    # Modül ilk öznitelik erişiminde yüklenir; açılışta ağır paketlerin maliyetini ertelemek için
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"{name} bulunamadı")
+    return _LazyModule(name)
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from shared_state import shared_path
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_input(value):
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize('NFC', value).split())
+    return value
+
+
+def make_key(namespace, model, *parts):
+    # Prompt metinleri de normalize edilir; böylece girdideki boşluk farkları aynı anahtara düşer
+    payload = json.dumps(
+        [namespace, model, [normalize_input(v) for v in parts]],
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, ttl=86400, max_items=512, db_path=None, max_rows=10000):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created_at)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM önbellek veritabanı açılamadı: {e}")
+            self._db = None
+
+    def _remember(self, key, value, expires_at):
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > now:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self._items[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                        (key, now),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM önbellek okunamadı: {e}")
+                    row = None
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        serialized = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, serialized, expires_at)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, serialized, expires_at, now),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._prune(now)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM önbelleğe yazılamadı: {e}")
+
+    def _prune(self, now):
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+def cache_from_env():
+    if os.getenv("LLM_CACHE_ENABLED", "True").lower() != "true":
+        return None
+    return LLMCache(
+        ttl=int(os.getenv("LLM_CACHE_TTL", 86400)),
+        max_items=int(os.getenv("LLM_CACHE_MAX_ITEMS", 512)),
+        db_path=os.getenv("LLM_CACHE_DB", shared_path('llm_cache.sqlite3', os.path.join('cache', 'llm_cache.sqlite3'))) or None,
+        max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", 10000)),
+    )
@@ -0,0 +1,114 @@
+import re
+
+
+# Tek çağrılık (birleşik) üretimde model çıktısı alan alan doğrulanır; hatalı alan yerine
+# aşamalı akıştaki varsayılan kullanılır, diğer alanlar korunur
+HEX_COLOR = re.compile(r'#[0-9A-Fa-f]{6}')
+TEXT_POSITIONS = ('center', 'top', 'bottom', 'left')
+
+DESIGN_DEFAULTS = {
+    "main_text": "BAŞLIK",
+    "sub_text": "",
+    "text_position": "center",
+    "emoji": "🎯",
+    # Render sırasında eksik renk alanları için kullanılan değerler
+    "colors": {
+        "overlay_start": "#000000",
+        "overlay_end": "#000000",
+        "overlay_opacity": 0.75,
+        "text_main": "#FFFFFF",
+        "text_stroke": "#000000",
+        "accent": "#FFD93D",
+        "shadow": "#000000",
+    },
+    # effects hiç yoksa modelin önerdiği set, kısmen varsa eksik alanlar render varsayılanlarıyla dolar
+    "effects": {"glow": True, "shadow_intensity": 0.8, "text_outline_width": 4},
+    "effect_fields": {"glow": False, "shadow_intensity": 0, "text_outline_width": 7},
+}
+
+
+def _text(value):
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def _text_list(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    items = [item.strip() for item in value if isinstance(item, str) and item.strip()]
+    return items or None
+
+
+def _number(value, low, high):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return min(max(number, low), high)
+
+
+def seo_score_estimate(seo):
+    score = 50
+    if len(seo.get('title', [])) >= 3: score += 10
+    if len(seo.get('tags', [])) >= 10: score += 12
+    if len(seo.get('description', '').split()) >= 250: score += 15
+    return min(score, 95)
+
+
+def apply_seo_defaults(data):
+    seo = dict(data) if isinstance(data, dict) else {}
+    seo['title'] = _text_list(seo.get('title')) or ["🎯 Başlık Yok"]
+    seo['tags'] = _text_list(seo.get('tags')) or ["genel", "video"]
+    seo['description'] = _text(seo.get('description')) or "Açıklama yok"
+    score = _number(seo.get('seo_score'), 0, 100)
+    seo['seo_score'] = int(score) if score is not None else seo_score_estimate(seo)
+    return seo
+
+
+def apply_design_defaults(data):
+    design = dict(data) if isinstance(data, dict) else {}
+    for field in ('main_text', 'emoji'):
+        design[field] = _text(design.get(field)) or DESIGN_DEFAULTS[field]
+    if not isinstance(design.get('sub_text'), str):
+        design['sub_text'] = DESIGN_DEFAULTS['sub_text']
+    if design.get('text_position') not in TEXT_POSITIONS:
+        design['text_position'] = DESIGN_DEFAULTS['text_position']
+
+    colors = design.get('colors') if isinstance(design.get('colors'), dict) else {}
+    checked = {}
+    for field, default in DESIGN_DEFAULTS['colors'].items():
+        value = colors.get(field)
+        if field == 'overlay_opacity':
+            value = _number(value, 0, 1)
+            checked[field] = default if value is None else value
+        else:
+            checked[field] = value if isinstance(value, str) and HEX_COLOR.fullmatch(value) else default
+    design['colors'] = checked
+
+    effects = design.get('effects')
+    if not isinstance(effects, dict):
+        design['effects'] = dict(DESIGN_DEFAULTS['effects'])
+        return design
+    defaults = DESIGN_DEFAULTS['effect_fields']
+    intensity = _number(effects.get('shadow_intensity'), 0, 1)
+    outline = _number(effects.get('text_outline_width'), 0, 20)
+    design['effects'] = {
+        **effects,
+        'glow': effects['glow'] if isinstance(effects.get('glow'), bool) else defaults['glow'],
+        'shadow_intensity': defaults['shadow_intensity'] if intensity is None else intensity,
+        'text_outline_width': defaults['text_outline_width'] if outline is None else int(outline),
+    }
+    return design
+
+
+def validate_combined(data):
+    # (açıklama, seo, tasarım) döner; açıklama yoksa None, çağıran aşamalı akışa düşer
+    if not isinstance(data, dict):
+        return None, None, None
+    description = _text(data.get('description'))
+    return description, apply_seo_defaults(data.get('seo')), apply_design_defaults(data.get('design'))
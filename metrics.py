@@ -0,0 +1,250 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import threading
+import time
+
+from shared_state import shared_path
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# İstek iş parçacığında ölçülen aşamalar Server-Timing başlığı için burada toplanır
+_request_timings = ContextVar('request_timings', default=None)
+# Süreç havuzunda ölçülen aşamalar çocuğun kayıt defterine değil, üst sürece dönen listeye yazılır
+_deferred_stages = ContextVar('deferred_stages', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    # prometheus_client'a bağımlı olmadan sayaç ve histogram; metin biçimi Prometheus 0.0.4
+    # Bu kadar yazım aralığı boyunca güncellenmeyen görüntü ölü worker'a ait sayılır
+    STALE_INTERVALS = 6
+
+    def __init__(self, snapshot_dir=None):
+        self._definitions = {}
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval = 10
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+
+    def counter(self, name, help_text):
+        self._definitions[name] = ("counter", help_text, None)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._definitions[name] = ("histogram", help_text, tuple(buckets))
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = self._definitions[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self._counters.items()],
+                "histograms": [
+                    [name, labels, dict(entry, buckets=list(entry["buckets"]))]
+                    for (name, labels), entry in self._histograms.items()
+                ],
+            }
+
+    def _write_snapshot(self):
+        path = os.path.join(self.snapshot_dir, f"{os.getpid()}.json")
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.warning(f"Metrik anlık görüntüsü yazılamadı: {e}")
+
+    def _collect(self):
+        # Paylaşımlı modda her worker kendi görüntüsünü yazar; /metrics hepsinin toplamını döner
+        if not self.snapshot_dir:
+            return [self.snapshot()]
+        self._write_snapshot()
+        snapshots = []
+        now = time.time()
+        for entry in os.scandir(self.snapshot_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            if self._stale(entry, now):
+                # Yeniden başlatılan worker'ların görüntüleri silinir; toplam sayaçlar o an düşer (Prometheus
+                # bunu sayaç sıfırlanması olarak işler)
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def _stale(self, entry, now):
+        try:
+            pid = int(entry.name[:-len('.json')])
+        except ValueError:
+            return False
+        if pid == os.getpid():
+            return False
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
+            return True
+        return not _pid_alive(pid) or now - mtime > self.snapshot_interval * self.STALE_INTERVALS
+
+    def render(self):
+        counters = {}
+        histograms = {}
+        for snapshot in self._collect():
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, entry in snapshot["histograms"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                total = histograms.setdefault(key, {"buckets": [0] * len(entry["buckets"]), "sum": 0.0, "count": 0})
+                total["buckets"] = [a + b for a, b in zip(total["buckets"], entry["buckets"])]
+                total["sum"] += entry["sum"]
+                total["count"] += entry["count"]
+
+        lines = []
+        for name, (kind, help_text, buckets) in self._definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_label_text(labels)} {value}")
+                continue
+            for (metric, labels), entry in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(buckets, entry["buckets"]):
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {entry['count']}")
+                lines.append(f"{name}_sum{_label_text(labels)} {entry['sum']:.6f}")
+                lines.append(f"{name}_count{_label_text(labels)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def start_snapshots(self, interval=10):
+        if not self.snapshot_dir:
+            return
+        self.snapshot_interval = interval
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self._write_snapshot()
+
+        threading.Thread(target=loop, name="metrics-snapshot", daemon=True).start()
+
+
+registry = MetricsRegistry(snapshot_dir=shared_path('metrics'))
+registry.histogram("ytseo_stage_seconds", "Pipeline aşamalarının süresi (saniye)")
+registry.histogram("ytseo_http_request_seconds", "HTTP isteklerinin süresi (saniye)")
+registry.counter("ytseo_http_requests_total", "HTTP istek sayısı")
+registry.counter("ytseo_openai_requests_total", "OpenAI çağrı sayısı")
+registry.counter("ytseo_openai_tokens_total", "OpenAI token kullanımı")
+registry.counter("ytseo_cache_requests_total", "Önbellek isabet/ıska sayısı")
+
+
+def record_stage(stage, seconds):
+    deferred = _deferred_stages.get()
+    if deferred is not None:
+        deferred.append((stage, seconds))
+        return
+    registry.observe("ytseo_stage_seconds", seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def deferred_stages():
+    stages = []
+    token = _deferred_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _deferred_stages.reset(token)
+
+
+def record_cache(cache, hit):
+    registry.inc("ytseo_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_openai(function, response=None, error=False):
+    registry.inc("ytseo_openai_requests_total", function=function, outcome="error" if error else "ok")
+    usage = getattr(response, 'usage', None)
+    for kind in ('prompt_tokens', 'completion_tokens'):
+        value = getattr(usage, kind, None)
+        if isinstance(value, int):
+            registry.inc("ytseo_openai_tokens_total", value, function=function, kind=kind.split('_')[0])
+
+
+def start_request():
+    _request_timings.set([])
+    return time.perf_counter()
+
+
+def finish_request(started, endpoint, method, status):
+    elapsed = time.perf_counter() - started
+    endpoint = endpoint or "unmatched"
+    registry.observe("ytseo_http_request_seconds", elapsed, endpoint=endpoint, method=method)
+    registry.inc("ytseo_http_requests_total", endpoint=endpoint, method=method, status=status)
+    timings = _request_timings.get() or []
+    _request_timings.set(None)
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings]
+    entries.append(f"total;dur={elapsed * 1000:.1f}")
+    return ", ".join(entries)
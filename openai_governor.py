@@ -0,0 +1,293 @@
+import logging
+import os
+import threading
+import time
+
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, stop_any, wait_random_exponential
+
+from shared_state import connect, shared_path
+
+
+logger = logging.getLogger(__name__)
+
+# Yaklaşık karakter/token oranı; gerçek kullanım yanıt gelince düzeltilir
+CHARS_PER_TOKEN = 3
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+class GovernorTimeout(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount, deadline):
+        # Tek istekte kapasiteyi aşan miktarlar kapasiteye sabitlenir, aksi halde hiç geçemez
+        amount = min(float(amount), self.capacity)
+        with self.condition:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise GovernorTimeout("OpenAI hız sınırı kuyruğunda zaman aşımı")
+                self.condition.wait(min(wait, remaining))
+
+    def adjust(self, delta):
+        with self.condition:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+            self.condition.notify_all()
+
+
+class SharedTokenBucket:
+    # Aynı makinedeki worker'lar tek bir kovayı SQLite üzerinden paylaşır; saat duvar saatidir
+    def __init__(self, db_path, name, per_minute):
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._db = connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "INSERT OR IGNORE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+            (name, self.capacity, time.time()),
+        )
+        self._lock = threading.Lock()
+
+    def _update(self, change):
+        # change(tokens) -> (yeni_tokens, sonuç); okuma ve yazma tek kilitli işlemde yapılır
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated = self._db.execute(
+                    "SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                now = time.time()
+                tokens = min(self.capacity, tokens + max(now - updated, 0) * self.rate)
+                tokens, result = change(tokens)
+                self._db.execute(
+                    "UPDATE token_buckets SET tokens = ?, updated = ? WHERE name = ?",
+                    (tokens, now, self.name),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    def acquire(self, amount, deadline):
+        amount = min(float(amount), self.capacity)
+
+        def take(tokens):
+            if tokens >= amount:
+                return tokens - amount, 0
+            return tokens, (amount - tokens) / self.rate
+
+        while True:
+            wait = self._update(take)
+            if wait == 0:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GovernorTimeout("OpenAI hız sınırı kuyruğunda zaman aşımı")
+            time.sleep(min(wait, remaining))
+
+    def adjust(self, delta):
+        self._update(lambda tokens: (min(self.capacity, tokens - delta), None))
+
+    @property
+    def tokens(self):
+        return self._update(lambda tokens: (tokens, tokens))
+
+
+class GovernedStream:
+    # Akış tüketilene (veya kapatılana) kadar çağrı sürüyor sayılır; gerçek kullanım son parçadaki usage'dan
+    def __init__(self, stream, on_finish):
+        self._stream = stream
+        self._iterator = iter(stream)
+        self._on_finish = on_finish
+        self._usage = None
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+        usage = getattr(chunk, 'usage', None)
+        if usage is not None:
+            self._usage = usage
+        return chunk
+
+    def close(self):
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            close = getattr(self._stream, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._on_finish(self._usage)
+
+    def __del__(self):
+        # İstemci bağlantıyı kesip akış yarıda bırakılırsa
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def is_retryable(error):
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        return getattr(error, 'code', None) != 'insufficient_quota'
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def estimate_tokens(messages, max_tokens=None):
+    prompt_chars = sum(len(m.get('content') or '') for m in messages)
+    return prompt_chars // CHARS_PER_TOKEN + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class OpenAIGovernor:
+    def __init__(self, requests_per_minute=500, tokens_per_minute=200000, max_attempts=4,
+                 queue_timeout=30, max_backoff=20, shared_db=None):
+        if shared_db:
+            self.requests = SharedTokenBucket(shared_db, 'openai_requests', requests_per_minute)
+            self.tokens = SharedTokenBucket(shared_db, 'openai_tokens', tokens_per_minute)
+        else:
+            self.requests = TokenBucket(requests_per_minute)
+            self.tokens = TokenBucket(tokens_per_minute)
+        self.max_attempts = max_attempts
+        self.queue_timeout = queue_timeout
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._max_waiting = 0
+        self._calls = 0
+        self._retries = 0
+        self._throttled_seconds = 0.0
+
+    def _admit(self, estimated, deadline=None):
+        with self._lock:
+            self._waiting += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+        started = time.monotonic()
+        try:
+            deadline = min(started + self.queue_timeout, deadline or float('inf'))
+            self.requests.acquire(1, deadline)
+            self.tokens.acquire(estimated, deadline)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                self._throttled_seconds += time.monotonic() - started
+
+    def _before_retry(self, retry_state):
+        with self._lock:
+            self._retries += 1
+        logger.warning(f"OpenAI tekrar deneniyor ({retry_state.attempt_number}): {retry_state.outcome.exception()}")
+
+    def _attempt(self, client, kwargs, deadline=None):
+        estimated = estimate_tokens(kwargs.get('messages', []), kwargs.get('max_tokens'))
+        self._admit(estimated, deadline)
+        if deadline is not None:
+            # Çağrı aşama süresinden uzun sürmesin; süre dolunca istemci isteği keser
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GovernorTimeout("OpenAI çağrısı için süre doldu")
+            client = client.with_options(timeout=remaining)
+        with self._lock:
+            self._in_flight += 1
+            self._calls += 1
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except BaseException:
+            self._finish(estimated, None)
+            raise
+        if kwargs.get('stream'):
+            return GovernedStream(response, lambda usage: self._finish(estimated, usage))
+        self._finish(estimated, getattr(response, 'usage', None))
+        return response
+
+    def _finish(self, estimated, usage):
+        with self._lock:
+            self._in_flight -= 1
+        total = getattr(usage, 'total_tokens', None)
+        if isinstance(total, int):
+            self.tokens.adjust(total - estimated)
+
+    def chat_completion(self, client, deadline=None, **kwargs):
+        # deadline (time.monotonic) verilirse kuyruk, bekleme ve tekrarlar dahil çağrı o ana kadar biter
+        if kwargs.get('stream'):
+            # Gerçek kullanım yalnızca istenirse son parçada gelir
+            kwargs.setdefault('stream_options', {"include_usage": True})
+        backoff = wait_random_exponential(multiplier=0.5, max=self.max_backoff)
+
+        def wait(retry_state):
+            delay = backoff(retry_state)
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0))
+            return delay
+
+        def expired(retry_state):
+            return deadline is not None and time.monotonic() >= deadline
+
+        retrying = Retrying(
+            retry=retry_if_exception(is_retryable),
+            wait=wait,
+            stop=stop_any(stop_after_attempt(self.max_attempts), expired),
+            before_sleep=self._before_retry,
+            reraise=True,
+        )
+        return retrying(self._attempt, client, kwargs, deadline)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "waiting": self._waiting,
+                "max_waiting": self._max_waiting,
+                "in_flight": self._in_flight,
+                "calls": self._calls,
+                "retries": self._retries,
+                "throttled_seconds": round(self._throttled_seconds, 3),
+                "available_requests": round(self.requests.tokens, 1),
+                "available_tokens": round(self.tokens.tokens, 1),
+            }
+
+
+def governor_from_env():
+    return OpenAIGovernor(
+        requests_per_minute=int(os.getenv("OPENAI_RPM", 500)),
+        tokens_per_minute=int(os.getenv("OPENAI_TPM", 200000)),
+        max_attempts=int(os.getenv("OPENAI_MAX_ATTEMPTS", 4)),
+        queue_timeout=float(os.getenv("OPENAI_QUEUE_TIMEOUT", 30)),
+        shared_db=shared_path('openai_governor.sqlite3'),
+    )
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from shared_state import connect, shared_path
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class OwnerQueueFull(QueueFull):
+    pass
+
+
+class RenderJobs:
+    def __init__(self, workers=2, max_pending=100, ttl=900, db_path=None, max_per_owner=3):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_owner = max_per_owner
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            # İş durumu paylaşılır; böylece durum sorgusu işi çalıştırmayan worker'a düşse de yanıtlanır
+            self._db = connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS render_jobs ("
+                "id TEXT PRIMARY KEY, job TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _pending(self, owner=None):
+        return sum(
+            1 for job in self._jobs.values()
+            if job['status'] in ('queued', 'running') and (owner is None or job['owner'] == owner)
+        )
+
+    def _sweep(self, now):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished_at'] is not None and now - job['finished_at'] > self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self._db is not None and expired:
+            self._db.execute("DELETE FROM render_jobs WHERE expires_at <= ?", (now,))
+
+    def _publish(self, job):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO render_jobs (id, job, expires_at) VALUES (?, ?, ?)",
+                (job['id'], json.dumps(job, ensure_ascii=False), (job['finished_at'] or job['created_at']) + self.ttl),
+            )
+        except Exception as e:
+            logger.warning(f"Render işi durumu paylaşılamadı: {e}")
+
+    def _owner_pending(self, owner, now):
+        if self._db is None:
+            return self._pending(owner)
+        # Paylaşımlı modda sahibin tüm worker'lardaki bekleyen ve çalışan işleri sayılır
+        return self._db.execute(
+            "SELECT COUNT(*) FROM render_jobs WHERE json_extract(job, '$.owner') = ? "
+            "AND json_extract(job, '$.status') IN ('queued', 'running') AND expires_at > ?",
+            (owner, now),
+        ).fetchone()[0]
+
+    def submit(self, fn, *args, owner=None):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            if self._pending() >= self.max_pending:
+                raise QueueFull("Render kuyruğu dolu")
+            job_id = uuid.uuid4().hex
+            job = {
+                'id': job_id,
+                'owner': owner,
+                'status': 'queued',
+                'created_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None,
+            }
+            if self._db is not None:
+                # Sayım ve kayıt tek yazma kilidinde; iki worker aynı anda son yuvayı alamaz
+                self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Tek oturum kuyruğu doldurup diğer kullanıcıları bekletemesin
+                limited = owner is not None and self.max_per_owner
+                if limited and self._owner_pending(owner, now) >= self.max_per_owner:
+                    raise OwnerQueueFull("Bu oturumun bekleyen işleri var")
+                self._jobs[job_id] = job
+                self._publish(job)
+            finally:
+                if self._db is not None:
+                    self._db.execute("COMMIT")
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                self._publish(job)
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status='running', started_at=time.time())
+        try:
+            result, error = fn(*args)
+        except Exception as e:
+            logger.error(f"Render işi hatası ({job_id}): {e}", exc_info=True)
+            result, error = None, "Thumbnail oluşturulamadı"
+        if error:
+            self._update(job_id, status='error', error=error, finished_at=time.time())
+        else:
+            self._update(job_id, status='done', result=result, finished_at=time.time())
+
+    def get(self, job_id, owner=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT job FROM render_jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+                ).fetchone()
+                job = json.loads(row[0]) if row else None
+            if job is None or job['owner'] != owner:
+                return None
+            return dict(job)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "max_per_owner": self.max_per_owner,
+                "jobs": counts,
+            }
+
+
+def jobs_from_env():
+    return RenderJobs(
+        workers=int(os.getenv("RENDER_WORKERS", 2)),
+        max_pending=int(os.getenv("RENDER_MAX_PENDING", 100)),
+        ttl=int(os.getenv("RENDER_JOB_TTL", 900)),
+        db_path=shared_path('render_jobs.sqlite3'),
+        max_per_owner=int(os.getenv("RENDER_MAX_PER_OWNER", 3)),
+    )
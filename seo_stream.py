@@ -0,0 +1,81 @@
+import json
+
+
+def format_sse(event, data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class StreamingObjectParser:
+    # Parça parça gelen JSON nesnesinde üst seviye alanları tamamlandıkça döndürür
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.state = 'start'
+        self.key = None
+        self.key_start = 0
+        self.value_start = 0
+
+    def _emit(self, end):
+        raw = self.buffer[self.value_start:end].strip()
+        self.state = 'key'
+        try:
+            return [(self.key, json.loads(raw))]
+        except ValueError:
+            return []
+
+    def feed(self, text):
+        self.buffer += text
+        fields = []
+        while self.pos < len(self.buffer):
+            i = self.pos
+            c = self.buffer[i]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.state == 'key':
+                        self.key = json.loads(self.buffer[self.key_start:i + 1])
+                        self.state = 'colon'
+                continue
+
+            if c.isspace():
+                continue
+
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.state == 'key':
+                    self.key_start = i
+                elif self.depth == 1 and self.state == 'value':
+                    self.value_start = i
+                    self.state = 'in_value'
+            elif c in '{[':
+                if self.depth == 0:
+                    self.state = 'key' if c == '{' else 'done'
+                elif self.depth == 1 and self.state == 'value':
+                    self.value_start = i
+                    self.state = 'in_value'
+                self.depth += 1
+            elif c in '}]':
+                self.depth -= 1
+                if self.depth == 0 and self.state == 'in_value':
+                    fields.extend(self._emit(i))
+                if self.depth == 0:
+                    self.state = 'done'
+            elif self.depth == 1:
+                if c == ':' and self.state == 'colon':
+                    self.state = 'value'
+                elif c == ',' and self.state == 'in_value':
+                    fields.extend(self._emit(i))
+                elif self.state == 'value':
+                    self.value_start = i
+                    self.state = 'in_value'
+        return fields
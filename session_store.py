@@ -0,0 +1,142 @@
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from shared_state import shared_path
+
+
+logger = logging.getLogger(__name__)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = sid is None
+        self.modified = False
+
+
+class SqliteSessionInterface(SessionInterface):
+    # Çerezde yalnızca imzalı oturum kimliği taşınır; veriler yerel SQLite'ta tutulur
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, db_path, sweep_interval=300):
+        self.db_path = db_path
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)")
+        self._db.commit()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return ServerSession()
+        try:
+            sid = self._signer(app).unsign(cookie).decode('utf-8')
+        except BadSignature:
+            return ServerSession()
+
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?",
+                    (sid, time.time()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Oturum okunamadı: {e}")
+            row = None
+        if row is None:
+            return ServerSession()
+        return ServerSession(self.serializer.loads(row[0]), sid=sid, expires_at=row[1])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        now = time.time()
+        lifetime = self._lifetime(app)
+
+        if not session:
+            if session.sid is not None and session.modified:
+                self._execute("DELETE FROM sessions WHERE sid = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        # Değişmeyen oturumlar süresinin yarısı dolana kadar yeniden yazılmaz
+        stale = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if not (session.modified or stale):
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.expires_at = now + lifetime
+        self._execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+            (session.sid, self.serializer.dumps(dict(session)), session.expires_at),
+        )
+        self._sweep(now)
+
+        if session.new or session.permanent:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('utf-8'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+        response.vary.add('Cookie')
+
+    def _execute(self, query, params):
+        try:
+            with self._lock:
+                self._db.execute(query, params)
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Oturum yazılamadı: {e}")
+
+    def _sweep(self, now):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self._execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+
+def session_interface_from_env():
+    backend = os.getenv("SESSION_BACKEND", "sqlite").lower()
+    if backend == "cookie":
+        return None
+    return SqliteSessionInterface(
+        db_path=os.getenv("SESSION_DB", shared_path('sessions.sqlite3', os.path.join('cache', 'sessions.sqlite3'))),
+        sweep_interval=int(os.getenv("SESSION_SWEEP_INTERVAL", 300)),
+    )
@@ -0,0 +1,131 @@
+import logging
+import os
+import shlex
+import sqlite3
+import sys
+import threading
+import time
+
+from limits.storage import Storage
+
+
+logger = logging.getLogger(__name__)
+
+# Ayarlanırsa aynı makinedeki tüm worker'lar hız sınırlarını, kuyrukları ve önbellekleri bu dizinde paylaşır.
+# Ayarlanmazsa render işlerinin durumu, thumbnail'ler ve hız sayaçları süreç içinde kalır; bu durumda uygulama
+# tek worker ile çalıştırılmalıdır (gunicorn -w 1), yoksa istekler başka worker'a düştüğünde 404 alınır
+SHARED_STATE_DIR = os.getenv("SHARED_STATE_DIR") or None
+
+
+def shared_path(name, default=None):
+    if SHARED_STATE_DIR is None:
+        return default
+    return os.path.join(SHARED_STATE_DIR, name)
+
+
+def configured_workers():
+    # gunicorn önceliği: komut satırı, GUNICORN_CMD_ARGS, WEB_CONCURRENCY
+    args = shlex.split(os.getenv("GUNICORN_CMD_ARGS", ""))
+    if os.path.basename(sys.argv[0]).startswith("gunicorn"):
+        args += sys.argv[1:]
+    workers = os.getenv("WEB_CONCURRENCY")
+    for i, arg in enumerate(args):
+        if arg in ("-w", "--workers") and i + 1 < len(args):
+            workers = args[i + 1]
+        elif arg.startswith("--workers="):
+            workers = arg.split("=", 1)[1]
+        elif arg.startswith("-w") and arg[2:].isdigit():
+            workers = arg[2:]
+    try:
+        return max(1, int(workers))
+    except (TypeError, ValueError):
+        return 1
+
+
+def connect(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Otomatik commit; çok adımlı güncellemeler BEGIN IMMEDIATE ile süreçler arası kilitlenir
+    db = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class SqliteLimiterStorage(Storage):
+    # storage_uri="sqlite:///cache/ratelimit.sqlite3" (göreli) veya "sqlite:////var/run/app/ratelimit.sqlite3"
+    STORAGE_SCHEME = ["sqlite"]
+    PRUNE_EVERY = 500
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._db = connect(uri[len("sqlite:///"):])
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._lock:
+            # Süresi dolmuş sayaç aynı ifadede sıfırlanır; böylece worker'lar arasında yarış olmaz
+            row = self._db.execute(
+                "INSERT INTO rate_limits (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END, "
+                "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+                "RETURNING value",
+                (key, amount, now + expiry, now, now),
+            ).fetchone()
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._db.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return row[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            with self._lock:
+                self._db.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._lock:
+            return self._db.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+def limiter_storage_uri():
+    uri = os.getenv("RATELIMIT_STORAGE_URI")
+    if uri:
+        return uri
+    path = shared_path('ratelimit.sqlite3')
+    if path is None:
+        return "memory://"
+    return "sqlite:///" + path
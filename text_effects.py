@@ -0,0 +1,58 @@
+from lazy_imports import lazy_import
+
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFilter = lazy_import('PIL.ImageFilter')
+
+
+SHADOW_OFFSET_RATIO = 0.06
+SHADOW_BLUR_RATIO = 0.04
+GLOW_OPACITY = 0.85
+
+
+def _text_mask(size, origin, text, font, stroke_width):
+    # Metni (kontur dahil) tek seferde maskeye çiz
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).text(origin, text, font=font, fill=255, stroke_width=stroke_width, stroke_fill=255)
+    return mask
+
+
+def _scale_mask(mask, factor):
+    factor = max(0.0, min(float(factor), 1.0))
+    return mask.point(lambda v: int(v * factor))
+
+
+def draw_text_with_effects(image, xy, text, font, fill, stroke_fill, stroke_width=0,
+                           glow_color=None, glow_radius=0,
+                           shadow_color=None, shadow_intensity=0.0):
+    stroke_width = max(0, int(stroke_width))
+    try:
+        shadow_intensity = float(shadow_intensity or 0)
+    except (TypeError, ValueError):
+        shadow_intensity = 0.0
+    draw = ImageDraw.Draw(image)
+
+    if text and ((glow_color and glow_radius > 0) or (shadow_color and shadow_intensity > 0)):
+        font_size = getattr(font, 'size', 40)
+        shadow_offset = max(2, int(font_size * SHADOW_OFFSET_RATIO))
+        shadow_blur = max(1, int(font_size * SHADOW_BLUR_RATIO))
+        pad = max(glow_radius, shadow_blur) * 3 + shadow_offset
+
+        left, top, right, bottom = draw.textbbox(xy, text, font=font, stroke_width=stroke_width)
+        box = (int(left) - pad, int(top) - pad, int(right) + pad, int(bottom) + pad)
+        size = (box[2] - box[0], box[3] - box[1])
+        origin = (xy[0] - box[0], xy[1] - box[1])
+        mask = _text_mask(size, origin, text, font, stroke_width)
+
+        if shadow_color and shadow_intensity > 0:
+            shadow_mask = Image.new('L', size, 0)
+            shadow_mask.paste(mask, (shadow_offset, shadow_offset))
+            shadow_mask = shadow_mask.filter(ImageFilter.GaussianBlur(shadow_blur))
+            image.paste(shadow_color, box, _scale_mask(shadow_mask, shadow_intensity))
+
+        if glow_color and glow_radius > 0:
+            glow_mask = mask.filter(ImageFilter.MaxFilter(3)).filter(ImageFilter.GaussianBlur(glow_radius))
+            image.paste(glow_color, box, _scale_mask(glow_mask, GLOW_OPACITY))
+
+    # Kontur ve dolgu Pillow'un yerel stroke desteğiyle tek çağrıda
+    draw.text(xy, text, font=font, fill=fill, stroke_width=stroke_width, stroke_fill=stroke_fill)
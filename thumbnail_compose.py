@@ -0,0 +1,169 @@
+import copy
+import time
+
+from font_registry import fit_font, load_font
+from lazy_imports import lazy_import
+from metrics import deferred_stages, record_stage, timed
+from text_effects import draw_text_with_effects
+from thumbnail_output import encode_outputs
+
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFilter = lazy_import('PIL.ImageFilter')
+
+
+# Varyant modunda LLM tasarımının üzerine uygulanan hazır stiller; ek LLM çağrısı gerektirmez
+THUMBNAIL_STYLES = {
+    'default': {},
+    'bold': {
+        'colors': {'overlay_opacity': 0.7, 'text_stroke': '#000000'},
+        'effects': {'glow': False, 'shadow_intensity': 1.0, 'text_outline_width': 9},
+    },
+    'neon': {
+        'colors': {'text_main': '#FFFFFF', 'text_stroke': '#FF00C8', 'accent': '#00F0FF', 'shadow': '#2B0040'},
+        'effects': {'glow': True, 'shadow_intensity': 0.6, 'text_outline_width': 4},
+    },
+    'bottom': {
+        'text_position': 'bottom',
+        'colors': {'overlay_opacity': 0.55},
+    },
+}
+
+
+def apply_style(design_data, style):
+    styled = copy.deepcopy(design_data)
+    for field, value in THUMBNAIL_STYLES[style].items():
+        if isinstance(value, dict):
+            styled[field] = {**(styled.get(field) or {}), **value}
+        else:
+            styled[field] = value
+    return styled
+
+
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+def _channel_column(start, end, height):
+    return bytes(int(start + (end - start) * (y / height)) for y in range(height))
+
+
+def _merge_columns(mode, columns, size):
+    # Kanal başına tek piksellik sütun üret, birleştir ve tüm genişliğe NEAREST ile kopyala
+    width, height = size
+    bands = [Image.frombytes('L', (1, height), column) for column in columns]
+    strip = Image.merge(mode, bands)
+    return strip.resize((width, height), Image.Resampling.NEAREST)
+
+
+def build_vertical_gradient(size, start_rgb, end_rgb):
+    columns = [_channel_column(s, e, size[1]) for s, e in zip(start_rgb, end_rgb)]
+    return _merge_columns('RGB', columns, size)
+
+
+def build_overlay_gradient(size, start_rgb, end_rgb, opacity):
+    height = size[1]
+    columns = [_channel_column(s, e, height) for s, e in zip(start_rgb, end_rgb)]
+    alpha = bytes(
+        int(255 * min(opacity + abs(0.5 - y / height) * 3.0 * 0.22, 0.92))
+        for y in range(height)
+    )
+    return _merge_columns('RGBA', columns + [alpha], size)
+
+
+def gradient_background(gradient, size):
+    start_color, end_color = gradient
+    return build_vertical_gradient(size, hex_to_rgb(start_color), hex_to_rgb(end_color))
+
+
+def compose_thumbnail(design_data, background):
+    width, height = background.size
+
+    with timed("render.overlay"):
+        colors = design_data.get('colors', {})
+        overlay = build_overlay_gradient(
+            (width, height),
+            hex_to_rgb(colors.get('overlay_start', '#000000')),
+            hex_to_rgb(colors.get('overlay_end', '#000000')),
+            colors.get('overlay_opacity', 0.75)
+        )
+
+        background = background.convert('RGBA')
+        background = Image.alpha_composite(background, overlay)
+        background = background.convert('RGB')
+
+    text_started = time.perf_counter()
+    draw = ImageDraw.Draw(background)
+    main_text = design_data.get('main_text', 'BAŞLIK').upper()
+    sub_text = design_data.get('sub_text', '')
+
+    main_font = fit_font(main_text, width - 120, max_size=110)
+    sub_font = load_font(55)
+
+    text_color = hex_to_rgb(colors.get('text_main', '#FFFFFF'))
+    stroke_color = hex_to_rgb(colors.get('text_stroke', '#000000'))
+    effects = design_data.get('effects', {})
+    stroke_width = effects.get('text_outline_width', 7)
+
+    # Emoji tamamen devre dışı
+    full_text = main_text
+    bbox = draw.textbbox((0, 0), full_text, font=main_font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    text_position = design_data.get('text_position', 'center')
+    if text_position == 'center':
+        x = (width - text_width) // 2
+        y = (height - text_height) // 2
+    elif text_position == 'top':
+        x = (width - text_width) // 2
+        y = 80
+    elif text_position == 'bottom':
+        x = (width - text_width) // 2
+        y = height - text_height - 100
+    else:
+        x = 80
+        y = (height - text_height) // 2
+
+    glow_color = hex_to_rgb(colors.get('accent', '#FFD93D')) if effects.get('glow') else None
+    shadow_color = hex_to_rgb(colors.get('shadow', '#000000'))
+    shadow_intensity = effects.get('shadow_intensity', 0)
+
+    draw_text_with_effects(
+        background, (x, y), full_text, main_font, text_color, stroke_color,
+        stroke_width=stroke_width,
+        glow_color=glow_color, glow_radius=max(6, stroke_width * 2),
+        shadow_color=shadow_color, shadow_intensity=shadow_intensity
+    )
+
+    if sub_text:
+        bbox_sub = draw.textbbox((0, 0), sub_text, font=sub_font)
+        sub_width = bbox_sub[2] - bbox_sub[0]
+        x_sub = (width - sub_width) // 2
+        y_sub = y + text_height + 30
+        draw_text_with_effects(
+            background, (x_sub, y_sub), sub_text, sub_font, text_color, stroke_color,
+            stroke_width=3,
+            shadow_color=shadow_color, shadow_intensity=shadow_intensity
+        )
+
+    record_stage("render.text", time.perf_counter() - text_started)
+
+    with timed("render.sharpen"):
+        background = background.filter(ImageFilter.SHARPEN)
+    return background
+
+
+def render_outputs(design_data, frame, background_ref, size):
+    # Süreç havuzunda çalışır: hazırlanmış arka plan ham RGB baytları olarak gelir, çözme tekrarlanmaz.
+    # (çıktılar, aşama süreleri) döner; süreler üst süreçte record_stage ile kaydedilir
+    with deferred_stages() as stages:
+        if frame is not None:
+            background = Image.frombytes('RGB', size, frame)
+        else:
+            background = gradient_background(background_ref['gradient'], size)
+        background = compose_thumbnail(design_data, background)
+        with timed("render.encode"):
+            outputs = encode_outputs(background)
+    return outputs, stages
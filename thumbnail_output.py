@@ -0,0 +1,75 @@
+import io
+import os
+
+from lazy_imports import lazy_import
+
+Image = lazy_import('PIL.Image')
+
+
+# 1280 yükleme kopyası; 640 ve 320 sayfa önizlemeleri (her biri bir öncekinin tam yarısı)
+OUTPUT_WIDTHS = (1280, 640, 320)
+MASTER_WIDTH = OUTPUT_WIDTHS[0]
+PREVIEW_WIDTH = OUTPUT_WIDTHS[1]
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", 90))
+PREVIEW_JPEG_QUALITY = int(os.getenv("PREVIEW_JPEG_QUALITY", 82))
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", 85))
+PREVIEW_WEBP_QUALITY = int(os.getenv("PREVIEW_WEBP_QUALITY", 80))
+
+# Render sırasında kodlanacak biçimler; diğerleri ilk istekte ana JPEG'den türetilir.
+# JPEG her zaman kodlanır: indirme ve türetme için kaynak odur.
+EAGER_FORMATS = ('jpeg',) + tuple(
+    fmt for fmt in (f.strip().lower() for f in os.getenv("THUMBNAIL_FORMATS", "jpeg").split(','))
+    if fmt in EXTENSIONS and fmt != 'jpeg'
+)
+
+
+def output_key(key, width=MASTER_WIDTH, fmt='jpeg'):
+    # Ana JPEG çıplak anahtarı kullanır; diğerleri "<key>-640.webp" gibi uzantılı adlar alır
+    if width == MASTER_WIDTH and fmt == 'jpeg':
+        return key
+    suffix = "" if width == MASTER_WIDTH else f"-{width}"
+    return f"{key}{suffix}.{EXTENSIONS[fmt]}"
+
+
+def _save_options(width, fmt):
+    preview = width != MASTER_WIDTH
+    if fmt == 'webp':
+        return {'quality': PREVIEW_WEBP_QUALITY if preview else WEBP_QUALITY, 'method': 4}
+    return {
+        'quality': PREVIEW_JPEG_QUALITY if preview else JPEG_QUALITY,
+        'optimize': True,
+        'progressive': True,
+    }
+
+
+def _encode(image, width, fmt, buffer):
+    buffer.seek(0)
+    buffer.truncate()
+    image.save(buffer, fmt.upper(), **_save_options(width, fmt))
+    return buffer.getvalue()
+
+
+def encode_outputs(image, formats=EAGER_FORMATS):
+    # Tek kompozit kareden tüm boyutlar: her önizleme bir öncekinin reduce(2) ile yarısı
+    outputs = {}
+    buffer = io.BytesIO()
+    frame = image
+    for width in OUTPUT_WIDTHS:
+        if frame.width != width:
+            frame = frame.reduce(frame.width // width)
+        for fmt in formats:
+            outputs[(width, fmt)] = _encode(frame, width, fmt, buffer)
+    return outputs
+
+
+def encode_from_master(master, width, fmt):
+    image = Image.open(io.BytesIO(master))
+    if width != MASTER_WIDTH:
+        # Küçük önizlemelerde JPEG doğrudan düşük ölçekte çözülür
+        image.draft('RGB', (width, width * image.height // image.width))
+        if image.width != width:
+            image = image.resize((width, width * image.height // image.width), Image.Resampling.LANCZOS)
+    return _encode(image, width, fmt, io.BytesIO())
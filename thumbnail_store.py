@@ -0,0 +1,180 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from shared_state import SHARED_STATE_DIR, shared_path
+
+
+# Render hattı değiştiğinde diskteki eski çıktıların geçersiz olması için artırın
+RENDER_VERSION = 3
+STORED_EXTENSIONS = ('.jpg', '.webp')
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(design_data, background_ref, variant=""):
+    payload = json.dumps(
+        {
+            "v": RENDER_VERSION,
+            "design": design_data,
+            "background": background_ref,
+            "variant": variant,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ThumbnailStore:
+    # Disk taraması her yazımda değil; izlenen toplam sınırı aşınca veya her TRIM_EVERY yazımda bir yapılır
+    TRIM_EVERY = 200
+    # Sınır aşılınca kapasitenin bu oranına kadar silinir; sonraki yazımlar hemen yeni tarama tetiklemesin
+    TRIM_TARGET = 0.9
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._disk_bytes = None
+        self._puts = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Varyantlar uzantılarını anahtarda taşır ("<key>.webp"); ana çıktı JPEG'dir
+        name = key if os.path.splitext(key)[1] else f"{key}.jpg"
+        return os.path.join(self.directory, name)
+
+    def _remember(self, key, data):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._items[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+                os.utime(self._path(key))
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self._remember(key, data)
+                    self.hits += 1
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = None
+        try:
+            # Aynı anahtarı yazan worker'lar birbirinin geçici dosyasını ezmesin
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Thumbnail diske yazılamadı: {e}")
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            self._puts += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            trim = (
+                self._disk_bytes is None
+                or self._disk_bytes > self.max_disk_bytes
+                or self._puts % self.TRIM_EVERY == 0
+            )
+        if trim:
+            self._trim_disk()
+
+    def _trim_disk(self):
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith('.tmp'):
+                    # Yazarken çöken süreçlerden kalanlar
+                    if now - stat.st_mtime > self.STALE_TMP_SECONDS:
+                        os.remove(entry.path)
+                    continue
+                if entry.name.endswith(STORED_EXTENSIONS):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            except OSError:
+                continue
+        if total > self.max_disk_bytes:
+            target = self.max_disk_bytes * self.TRIM_TARGET
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= target:
+                    break
+        # Diğer worker'ların yazdıkları da bu taramayla sayıma katılır
+        with self._lock:
+            self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def store_from_env():
+    # Paylaşımlı modda disk katmanı ortak, worker başına bellek katmanı küçük tutulur
+    default_max_bytes = 8 * 1024 * 1024 if SHARED_STATE_DIR else 64 * 1024 * 1024
+    return ThumbnailStore(
+        max_bytes=int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", default_max_bytes)),
+        directory=os.getenv("THUMBNAIL_CACHE_DIR") or shared_path('thumbnails'),
+        max_disk_bytes=int(os.getenv("THUMBNAIL_CACHE_MAX_DISK_BYTES", 512 * 1024 * 1024)),
+    )
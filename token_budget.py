@@ -0,0 +1,197 @@
+from collections import deque
+import logging
+import math
+import os
+import threading
+import time
+
+from openai_governor import CHARS_PER_TOKEN
+from shared_state import connect, shared_path
+
+
+logger = logging.getLogger(__name__)
+
+# Sabit üst sınırlar; gözlem yokken veya yeterli örnek birikmeden önce kullanılır
+DEFAULT_CEILINGS = {
+    "description": 1500,
+    "seo": 2000,
+    "seo_stream": 2000,
+    "design": 700,
+    "pipeline": 3500,
+}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+
+def truncate_tokens(text, max_tokens):
+    # Yaklaşık token sınırı; kelime ortasında kesmemek için son boşluğa geri çekilir
+    limit = max_tokens * CHARS_PER_TOKEN
+    if not text or len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(' ')
+    if space > limit * 0.8:
+        cut = cut[:space]
+    return cut.rstrip()
+
+
+class TokenBudget:
+    # Çağrı başına token ve gecikme kaydı; max_tokens son örneklerin yüksek yüzdeliğinden türetilir
+    PRUNE_EVERY = 200
+
+    def __init__(self, ceilings=None, window=500, min_samples=20, percentile=0.99, headroom=1.25,
+                 floor=128, refresh_interval=30, db_path=None):
+        self.ceilings = dict(DEFAULT_CEILINGS, **(ceilings or {}))
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.headroom = headroom
+        self.floor = floor
+        self.refresh_interval = refresh_interval
+        self._samples = {}
+        self._caps = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+        if db_path:
+            # Paylaşımlı modda örnekler tüm worker'ların ortak dağılımını oluşturur
+            self._db = connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_usage ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, function TEXT NOT NULL, category TEXT NOT NULL, "
+                "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+                "seconds REAL NOT NULL, finish_reason TEXT, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS token_usage_function ON token_usage (function, id)")
+
+    def record(self, function, category, usage, seconds, finish_reason=None):
+        prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        if not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int):
+            return
+        sample = (category or "", prompt_tokens, completion_tokens, seconds, finish_reason)
+        if self._db is not None:
+            try:
+                self._db.execute(
+                    "INSERT INTO token_usage (function, category, prompt_tokens, completion_tokens, "
+                    "seconds, finish_reason, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (function, *sample, time.time()),
+                )
+                with self._lock:
+                    self._writes += 1
+                    prune = self._writes % self.PRUNE_EVERY == 0
+                if prune:
+                    self._prune(function)
+            except Exception as e:
+                logger.warning(f"Token kullanımı kaydedilemedi: {e}")
+            return
+        with self._lock:
+            samples = self._samples.get(function)
+            if samples is None:
+                samples = self._samples[function] = deque(maxlen=self.window)
+            samples.append(sample)
+            self._caps.pop(function, None)
+
+    def _prune(self, function):
+        self._db.execute(
+            "DELETE FROM token_usage WHERE function = ? AND id <= "
+            "(SELECT id FROM token_usage WHERE function = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (function, function, self.window),
+        )
+
+    def _recent(self, function):
+        if self._db is None:
+            with self._lock:
+                return list(self._samples.get(function, ()))
+        return self._db.execute(
+            "SELECT category, prompt_tokens, completion_tokens, seconds, finish_reason FROM token_usage "
+            "WHERE function = ? ORDER BY id DESC LIMIT ?",
+            (function, self.window),
+        ).fetchall()
+
+    def _functions(self):
+        if self._db is None:
+            with self._lock:
+                return set(self._samples)
+        return {row[0] for row in self._db.execute("SELECT DISTINCT function FROM token_usage")}
+
+    def _derive(self, function, samples):
+        ceiling = self.ceilings.get(function)
+        if ceiling is None or len(samples) < self.min_samples:
+            return ceiling
+        # Sınıra takılan yanıtın gerçek uzunluğu bilinmez; tavan kadar sayılır, sık kesilmede sınır tavana döner
+        completions = [ceiling if finish == 'length' else completion for _, _, completion, _, finish in samples]
+        observed = _percentile(completions, self.percentile)
+        return max(self.floor, min(ceiling, int(math.ceil(observed * self.headroom))))
+
+    def max_tokens(self, function):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._caps.get(function)
+            if cached is not None and now - cached[1] < self.refresh_interval:
+                return cached[0]
+        try:
+            cap = self._derive(function, self._recent(function))
+        except Exception as e:
+            logger.warning(f"Token bütçesi hesaplanamadı: {e}")
+            cap = self.ceilings.get(function)
+        with self._lock:
+            self._caps[function] = (cap, now)
+        return cap
+
+    def stats(self):
+        functions = {}
+        for function in sorted(self._functions()):
+            samples = self._recent(function)
+            prompts = [s[1] for s in samples]
+            completions = [s[2] for s in samples]
+            latencies = [s[3] * 1000 for s in samples]
+            categories = {}
+            for category, prompt_tokens, completion_tokens, seconds, _ in samples:
+                entry = categories.setdefault(
+                    category, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0}
+                )
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["latency_ms"] += seconds * 1000
+            for entry in categories.values():
+                entry["latency_ms"] = round(entry["latency_ms"] / entry["calls"], 1)
+            functions[function] = {
+                "samples": len(samples),
+                "max_tokens": self.max_tokens(function),
+                "ceiling": self.ceilings.get(function),
+                "length_stops": sum(1 for s in samples if s[4] == 'length'),
+                "prompt_tokens": {"p50": _percentile(prompts, 0.5), "p95": _percentile(prompts, 0.95)},
+                "completion_tokens": {
+                    "p50": _percentile(completions, 0.5),
+                    "p95": _percentile(completions, 0.95),
+                    "p99": _percentile(completions, 0.99),
+                },
+                "latency_ms": {
+                    "p50": round(_percentile(latencies, 0.5), 1),
+                    "p95": round(_percentile(latencies, 0.95), 1),
+                },
+                "by_category": categories,
+            }
+        return {"window": self.window, "min_samples": self.min_samples, "functions": functions}
+
+
+def budget_from_env():
+    ceilings = {
+        function: int(os.getenv(f"MAX_TOKENS_{function.upper()}", ceiling))
+        for function, ceiling in DEFAULT_CEILINGS.items()
+    }
+    return TokenBudget(
+        ceilings=ceilings,
+        window=int(os.getenv("TOKEN_BUDGET_WINDOW", 500)),
+        min_samples=int(os.getenv("TOKEN_BUDGET_MIN_SAMPLES", 20)),
+        percentile=float(os.getenv("TOKEN_BUDGET_PERCENTILE", 0.99)),
+        headroom=float(os.getenv("TOKEN_BUDGET_HEADROOM", 1.25)),
+        db_path=shared_path('token_budget.sqlite3'),
+    )